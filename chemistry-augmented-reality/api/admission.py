@@ -0,0 +1,124 @@
+"""
+Admission control in front of the frame executor.
+
+Requests are admitted before their upload is read, so a saturated server
+answers in microseconds instead of queueing uploads until they time out.
+/process_frame, /process_batch and /process_video requests each take one
+slot for their whole duration, and /ws/frames takes one per frame:
+
+- at most ADMISSION_MAX_IN_FLIGHT frame requests are handled at once;
+  beyond that the answer is 503
+- one client (session, or address for clients without one) may have at
+  most ADMISSION_PER_CLIENT requests in flight; beyond that the answer is 429
+
+Both carry a Retry-After estimated from the recent request durations. Every
+admitted request gets a deadline (REQUEST_DEADLINE seconds, or less when
+the client asks for it with X-Request-Timeout) that travels with its job to
+the executor, which drops jobs whose deadline passed while they waited.
+"""
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+
+from api.executor import frame_executor
+
+# Deployment configuration
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get(
+    "ADMISSION_MAX_IN_FLIGHT", frame_executor.workers + frame_executor.queue_depth
+))
+ADMISSION_PER_CLIENT = int(os.environ.get("ADMISSION_PER_CLIENT", 2))
+REQUEST_DEADLINE = float(os.environ.get("REQUEST_DEADLINE", 10.0))
+
+DEADLINE_HEADER = "x-request-timeout"
+MAX_RETRY_AFTER = 30
+# Weight of the latest request in the average request duration
+DURATION_SMOOTHING = 0.2
+
+
+class OverloadedError(RuntimeError):
+    """The server is handling as many frame requests as it can"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ClientLimitError(OverloadedError):
+    """The client already has ADMISSION_PER_CLIENT requests in flight"""
+
+
+class AdmissionController:
+    """
+    Counts the frame requests in flight, globally and per client.
+    admit() checks the limits and takes its slot without awaiting in
+    between, so two requests cannot both take the last slot.
+    """
+
+    def __init__(self, max_in_flight: int = ADMISSION_MAX_IN_FLIGHT, per_client: int = ADMISSION_PER_CLIENT,
+                 deadline: float = REQUEST_DEADLINE, concurrency: int = frame_executor.workers):
+        self.max_in_flight = max(1, max_in_flight)
+        self.per_client = max(1, per_client)
+        self.deadline = deadline
+        self.concurrency = max(1, concurrency)
+        self.in_flight = 0
+        self.mean_duration = 0.1
+        self._clients: dict[str, int] = {}
+
+    def retry_after(self, waiting: int) -> int:
+        """Seconds until `waiting` requests are likely done, for Retry-After"""
+        seconds = self.mean_duration * waiting / self.concurrency
+        return min(MAX_RETRY_AFTER, max(1, math.ceil(seconds)))
+
+    def timeout(self, requested: str | None) -> float:
+        """Time budget of a request: the client's X-Request-Timeout, capped by REQUEST_DEADLINE"""
+        try:
+            timeout = float(requested) if requested is not None else self.deadline
+        except ValueError:
+            timeout = self.deadline
+        return min(timeout, self.deadline) if timeout > 0 else self.deadline
+
+    @asynccontextmanager
+    async def admit(self, client: str, requested_timeout: str | None = None, timed: bool = True):
+        """
+        Hold one request slot of a client.
+
+        Args:
+            client: Client identity for the per-client limit
+            requested_timeout: X-Request-Timeout header of the request
+            timed: Whether the duration feeds the Retry-After estimate; off
+                for batches and videos, which hold their slot far longer
+                than a frame
+
+        Yields:
+            time.monotonic() deadline of the request
+        """
+        if self.in_flight >= self.max_in_flight:
+            raise OverloadedError("Server is busy, try again later", self.retry_after(self.in_flight))
+        count = self._clients.get(client, 0)
+        if count >= self.per_client:
+            raise ClientLimitError("Too many frames in flight for this client", self.retry_after(count))
+
+        self.in_flight += 1
+        self._clients[client] = count + 1
+        start = time.monotonic()
+        try:
+            yield start + self.timeout(requested_timeout)
+        finally:
+            self.in_flight -= 1
+            remaining = self._clients[client] - 1
+            if remaining:
+                self._clients[client] = remaining
+            else:
+                del self._clients[client]
+            if timed:
+                duration = time.monotonic() - start
+                self.mean_duration += DURATION_SMOOTHING * (duration - self.mean_duration)
+
+    @property
+    def clients(self) -> int:
+        """Clients with at least one request in flight"""
+        return len(self._clients)
+
+
+admission = AdmissionController()
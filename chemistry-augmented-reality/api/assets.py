@@ -0,0 +1,193 @@
+"""
+In-memory serving of the web interface and small JSON documents.
+
+Every classroom tablet loads the same three files, so they are read once,
+compressed once (gzip, plus brotli when the optional `brotli` package is
+installed) and served from memory with a strong ETag. A request carrying
+the current ETag in If-None-Match gets an empty 304.
+
+index.html refers to its script and stylesheet through URLs versioned with
+their content hash (/static/script.js?v=...), so those responses can be
+cached as immutable; index.html itself is always revalidated. Files are
+re-read when their modification time changes, checked at most every
+ASSET_CHECK_INTERVAL seconds.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import time
+from typing import NamedTuple
+
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Deployment configuration
+ASSET_CHECK_INTERVAL = float(os.environ.get("ASSET_CHECK_INTERVAL", 1.0))
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+STATIC_PREFIX = "/static/"
+INDEX_FILE = "index.html"
+
+# Cache-Control of each kind of response
+CACHE_REVALIDATE = "no-cache"
+CACHE_IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Smaller bodies fit in a packet anyway
+MIN_COMPRESS_BYTES = 512
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+# src="/static/..." and href="/static/..." attributes of index.html
+STATIC_REFERENCE = re.compile(r'((?:src|href)=")' + re.escape(STATIC_PREFIX) + r'([^"?#]+)(")')
+
+
+class Asset(NamedTuple):
+    body: bytes
+    media_type: str
+    etag: str
+    # Content-Encoding -> compressed body, only when smaller than the original
+    encoded: dict[str, bytes]
+
+
+def _compress(body: bytes, media_type: str) -> dict[str, bytes]:
+    if len(body) < MIN_COMPRESS_BYTES or not media_type.startswith(COMPRESSIBLE_TYPES):
+        return {}
+    encoded = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded["br"] = brotli.compress(body)
+    return {encoding: data for encoding, data in encoded.items() if len(data) < len(body)}
+
+
+def make_asset(body: bytes, media_type: str) -> Asset:
+    """Hash and precompress a response body"""
+    etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+    return Asset(body, media_type, etag, _compress(body, media_type))
+
+
+def _accepted_encodings(accept_encoding: str) -> set[str]:
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # Compressed variants share the ETag of the original with a suffix
+    base = etag[:-1]
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip().removeprefix("W/")
+        if candidate == "*" or candidate == etag or candidate.startswith(base + "-"):
+            return True
+    return False
+
+
+def asset_response(request, asset: Asset, cache_control: str = CACHE_REVALIDATE) -> Response:
+    """Response for an in-memory asset: 304, a precompressed variant or the original"""
+    headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+    encoding = next((coding for coding in ("br", "gzip") if coding in asset.encoded and coding in accepted), None)
+    headers["ETag"] = asset.etag if encoding is None else f'{asset.etag[:-1]}-{encoding}"'
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and _etag_matches(if_none_match, asset.etag):
+        return Response(status_code=304, headers=headers)
+    if encoding is None:
+        return Response(asset.body, media_type=asset.media_type, headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(asset.encoded[encoding], media_type=asset.media_type, headers=headers)
+
+
+class _LoadedFile(NamedTuple):
+    asset: Asset
+    mtime: float
+    checked: float
+    # (name, version) of the static files whose versioned URLs are in the body
+    references: tuple = ()
+
+
+class AssetStore:
+    """
+    Files of a directory held in memory. Safe to call from any thread: a
+    reload builds the new asset aside and swaps it in with one assignment
+    (two threads may both re-read a changed file, which is harmless).
+    """
+
+    def __init__(self, directory: str = STATIC_DIR, check_interval: float = ASSET_CHECK_INTERVAL):
+        self.directory = os.path.realpath(directory)
+        self.check_interval = check_interval
+        self._files: dict[str, _LoadedFile] = {}
+
+    def _path(self, name: str) -> str | None:
+        path = os.path.realpath(os.path.join(self.directory, name))
+        if not path.startswith(self.directory + os.sep) or not os.path.isfile(path):
+            return None
+        return path
+
+    def get(self, name: str) -> Asset | None:
+        """Asset of a file of the directory, or None when there is no such file"""
+        loaded = self._files.get(name)
+        now = time.monotonic()
+        if loaded is not None and now - loaded.checked < self.check_interval:
+            return loaded.asset
+
+        path = self._path(name)
+        if path is None:
+            self._files.pop(name, None)
+            return None
+        mtime = os.path.getmtime(path)
+        if loaded is not None and loaded.mtime == mtime and all(
+            self.version(reference) == version for reference, version in loaded.references
+        ):
+            self._files[name] = loaded._replace(checked=now)
+            return loaded.asset
+
+        with open(path, "rb") as f:
+            body = f.read()
+        references = ()
+        if name == INDEX_FILE:
+            body, references = self._version_references(body)
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type == "application/javascript":
+            media_type += "; charset=utf-8"
+        asset = make_asset(body, media_type)
+        self._files[name] = _LoadedFile(asset, mtime, now, references)
+        return asset
+
+    def version(self, name: str) -> str | None:
+        """Content hash of a file, used to version its URL"""
+        asset = self.get(name)
+        return asset.etag.strip('"') if asset is not None else None
+
+    def is_current(self, name: str, version: str | None) -> bool:
+        return version is not None and version == self.version(name)
+
+    def _version_references(self, html: bytes) -> tuple[bytes, tuple]:
+        """Append ?v=<content hash> to the static URLs of an HTML page.
+        Returns the new page and the (name, version) of every reference"""
+        references = []
+
+        def versioned(match: re.Match) -> str:
+            version = self.version(match.group(2))
+            if version is None:
+                return match.group(0)
+            references.append((match.group(2), version))
+            return f"{match.group(1)}{STATIC_PREFIX}{match.group(2)}?v={version}{match.group(3)}"
+
+        html = STATIC_REFERENCE.sub(versioned, html.decode("utf-8")).encode("utf-8")
+        return html, tuple(references)
+
+
+static_assets = AssetStore()
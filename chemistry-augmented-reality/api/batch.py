@@ -0,0 +1,160 @@
+"""
+Batch processing of many images in one request
+"""
+import asyncio
+import base64
+import io
+import json
+import os
+import time
+import zipfile
+
+from api.executor import frame_executor, ExecutorBusyError, DeadlineExceededError
+from api.levels import LevelTable
+from api.metrics import observe_stages
+from api.pipeline import process_image, detect_image, FrameOptions, InvalidFrameError
+from api.uploads import check_content_length, stream_files
+
+MAX_BATCH_FILES = int(os.environ.get("MAX_BATCH_FILES", 64))
+MAX_BATCH_BYTES = int(os.environ.get("MAX_BATCH_BYTES", 200 * 1024 * 1024))
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff")
+
+BATCH_FIELD = b"files"
+# OpenAPI description of the body accepted by read_batch
+BATCH_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}},
+                    "required": ["files"],
+                }
+            },
+        },
+    }
+}
+
+
+class BatchTooLargeError(ValueError):
+    """The batch has too many images or too many bytes"""
+
+
+def is_zip(filename: str, content_type: str | None) -> bool:
+    return (filename or "").lower().endswith(".zip") or content_type in (
+        "application/zip", "application/x-zip-compressed"
+    )
+
+
+def extract_zip(contents: bytes) -> list[tuple[str, bytes]]:
+    """Read the image entries of a zip archive, enforcing the batch limits"""
+    images = []
+    total = 0
+    with zipfile.ZipFile(io.BytesIO(contents)) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            total += info.file_size
+            if len(images) >= MAX_BATCH_FILES or total > MAX_BATCH_BYTES:
+                raise BatchTooLargeError(
+                    f"Batch exceeds {MAX_BATCH_FILES} images or {MAX_BATCH_BYTES} bytes"
+                )
+            images.append((info.filename, archive.read(info)))
+    return images
+
+
+class _BatchWriter:
+    """Collects the uploaded files, enforcing the batch limits as they arrive"""
+
+    def __init__(self):
+        self.files: list[tuple[str | None, str | None, bytearray]] = []
+        self.size = 0
+
+    def begin(self, filename: str | None, content_type: str | None) -> None:
+        if len(self.files) >= MAX_BATCH_FILES:
+            raise BatchTooLargeError(f"Batch exceeds {MAX_BATCH_FILES} images or {MAX_BATCH_BYTES} bytes")
+        self.files.append((filename, content_type, bytearray()))
+
+    def write(self, data, start: int = 0, end: int | None = None) -> None:
+        end = len(data) if end is None else end
+        self.size += end - start
+        if self.size > MAX_BATCH_BYTES:
+            raise BatchTooLargeError(f"Batch exceeds {MAX_BATCH_FILES} images or {MAX_BATCH_BYTES} bytes")
+        self.files[-1][2].extend(memoryview(data)[start:end])
+
+
+async def read_batch(request) -> list[tuple[str, bytes]]:
+    """
+    Stream the files of the "files" field, expanding zip archives into
+    their images. The request is rejected from its Content-Length, or as
+    soon as the files read so far exceed MAX_BATCH_FILES or MAX_BATCH_BYTES.
+    """
+    check_content_length(request, MAX_BATCH_BYTES, BatchTooLargeError)
+    writer = _BatchWriter()
+    await stream_files(request, BATCH_FIELD, writer)
+
+    images = []
+    for filename, content_type, contents in writer.files:
+        if is_zip(filename, content_type):
+            images.extend(await asyncio.to_thread(extract_zip, contents))
+        else:
+            images.append((filename, contents))
+
+    if len(images) > MAX_BATCH_FILES or sum(len(c) for _, c in images) > MAX_BATCH_BYTES:
+        raise BatchTooLargeError(
+            f"Batch exceeds {MAX_BATCH_FILES} images or {MAX_BATCH_BYTES} bytes"
+        )
+    return images
+
+
+async def process_batch_item(index: int, filename: str, contents: bytes, level: LevelTable,
+                             output: str, options: FrameOptions, slots: asyncio.Semaphore, timeout: float) -> dict:
+    result = {"index": index, "filename": filename, "level": level.number}
+    async with slots:
+        try:
+            # Each image gets the request's time budget from when it is submitted
+            deadline = time.monotonic() + timeout
+            if output == "image":
+                encoded_img, timings = await frame_executor.run(
+                    process_image, contents, level, options, deadline=deadline
+                )
+                result["media_type"] = options.media_type
+                result["image"] = base64.b64encode(encoded_img).decode("ascii")
+            else:
+                detection, timings = await frame_executor.run(
+                    detect_image, contents, level, options, deadline=deadline
+                )
+                result.update(detection)
+            observe_stages(timings)
+        except (InvalidFrameError, ExecutorBusyError, DeadlineExceededError) as e:
+            result["error"] = str(e)
+        except Exception as e:
+            result["error"] = f"Error processing frame: {str(e)}"
+    return result
+
+
+async def stream_batch(images: list[tuple[str, bytes]], level: LevelTable, output: str,
+                       options: FrameOptions, timeout: float, release=None):
+    """
+    Process the images in parallel and yield one NDJSON line per image, in
+    the order they finish. Each line carries the image index and filename.
+    Images still waiting for a worker `timeout` seconds after they were
+    submitted are reported as errors. `release` is awaited once the stream
+    ends, however it ends.
+    """
+    # Leave room in the executor queue for other clients
+    slots = asyncio.Semaphore(frame_executor.workers)
+    tasks = [
+        asyncio.create_task(process_batch_item(i, name, contents, level, output, options, slots, timeout))
+        for i, (name, contents) in enumerate(images)
+    ]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield json.dumps(await task) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+        if release is not None:
+            await release()
@@ -0,0 +1,93 @@
+"""
+Content-addressed cache of /process_frame results.
+
+The same images get uploaded over and over (sample markers, test
+composites), so finished responses are kept in a bounded LRU keyed by a
+hash of the upload bytes plus everything that changes the output. A hit
+returns the stored encoded bytes without decoding the upload.
+"""
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import NamedTuple
+
+from api.pipeline import FrameOptions
+
+# Deployment configuration
+CACHE_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_ENTRIES", 256))
+CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_BYTES", 64 * 1024 * 1024))
+
+# Hashing releases the GIL, so large uploads are hashed off the event loop
+HASH_IN_THREAD_BYTES = 1024 * 1024
+
+
+class CachedResult(NamedTuple):
+    body: bytes
+    media_type: str
+
+
+class ResultCache:
+    """
+    LRU of encoded responses capped by entry count and total body size.
+    get() and put() never await, so requests cannot interleave an update
+    of the entries and their byte count.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple, CachedResult] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    async def key(self, contents: bytes, level_key: tuple, output: str, options: FrameOptions) -> tuple:
+        """Cache key of one upload: content digest plus level and output options"""
+        if len(contents) >= HASH_IN_THREAD_BYTES:
+            digest = await asyncio.to_thread(_digest, contents)
+        else:
+            digest = _digest(contents)
+        return digest, level_key, output, options
+
+    def get(self, key: tuple) -> CachedResult | None:
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key: tuple, body: bytes, media_type: str) -> None:
+        # Bodies larger than the whole cache would only flush it
+        if not self.enabled or len(body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous.body)
+        self._entries[key] = CachedResult(body, media_type)
+        self.size += len(body)
+        while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted.body)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _digest(contents: bytes) -> bytes:
+    return hashlib.blake2b(contents, digest_size=16).digest()
+
+
+result_cache = ResultCache()
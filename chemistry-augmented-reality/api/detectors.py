@@ -0,0 +1,102 @@
+"""
+Pool of reusable ArUco detectors for the Chemistry AR API
+"""
+import json
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+import cv2
+
+# Deployment configuration
+DEFAULT_DICTIONARY = os.environ.get("ARUCO_DICTIONARY", "DICT_6X6_250")
+DEFAULT_PROFILE = os.environ.get("ARUCO_PROFILE", "default")
+POOL_SIZE = int(os.environ.get("DETECTOR_POOL_SIZE", os.cpu_count() or 1))
+
+# Parameter profiles, applied on top of cv2.aruco.DetectorParameters()
+DETECTOR_PROFILES = {
+    "default": {},
+    "subpix": {
+        "cornerRefinementMethod": cv2.aruco.CORNER_REFINE_SUBPIX,
+    },
+    "fast": {
+        "adaptiveThreshWinSizeMin": 5,
+        "adaptiveThreshWinSizeMax": 21,
+        "adaptiveThreshWinSizeStep": 8,
+        "minMarkerPerimeterRate": 0.02,
+    },
+}
+
+# Extra parameters for this deployment, e.g. ARUCO_PARAMS='{"minMarkerPerimeterRate": 0.05}'
+EXTRA_PARAMS = json.loads(os.environ.get("ARUCO_PARAMS", "{}"))
+
+
+def create_parameters(profile: str) -> cv2.aruco.DetectorParameters:
+    """Build the detector parameters for a profile name"""
+    if profile not in DETECTOR_PROFILES:
+        raise ValueError(f"Unknown detector profile: {profile}")
+
+    params = cv2.aruco.DetectorParameters()
+    for name, value in {**DETECTOR_PROFILES[profile], **EXTRA_PARAMS}.items():
+        if not hasattr(params, name):
+            raise ValueError(f"Unknown detector parameter: {name}")
+        setattr(params, name, value)
+    return params
+
+
+def create_dictionary(dictionary: str) -> cv2.aruco.Dictionary:
+    """Build a predefined ArUco dictionary from its name (e.g. DICT_6X6_250)"""
+    dictionary_id = getattr(cv2.aruco, dictionary, None)
+    if not dictionary.startswith("DICT_") or dictionary_id is None:
+        raise ValueError(f"Unknown ArUco dictionary: {dictionary}")
+    return cv2.aruco.getPredefinedDictionary(dictionary_id)
+
+
+class DetectorPool:
+    """
+    Long-lived ArucoDetector instances keyed by (dictionary, profile).
+
+    Each key owns a fixed number of detectors. A worker checks one out for
+    the duration of a detection, so concurrent workers never share an instance.
+    """
+
+    def __init__(self, size: int = POOL_SIZE):
+        self.size = max(1, size)
+        self._pools: dict[tuple[str, str], queue.Queue] = {}
+        self._lock = threading.Lock()
+
+    def build(self, dictionary: str = DEFAULT_DICTIONARY, profile: str = DEFAULT_PROFILE) -> queue.Queue:
+        """Create the detectors for a key, if they do not exist yet"""
+        key = (dictionary, profile)
+        with self._lock:
+            if key not in self._pools:
+                aruco_dict = create_dictionary(dictionary)
+                params = create_parameters(profile)
+                pool = queue.Queue(maxsize=self.size)
+                for _ in range(self.size):
+                    pool.put(cv2.aruco.ArucoDetector(aruco_dict, params))
+                self._pools[key] = pool
+            return self._pools[key]
+
+    @contextmanager
+    def acquire(self, dictionary: str = DEFAULT_DICTIONARY, profile: str = DEFAULT_PROFILE):
+        """Check out a detector, blocking until one is free"""
+        pool = self._pools.get((dictionary, profile)) or self.build(dictionary, profile)
+        detector = pool.get()
+        try:
+            yield detector
+        finally:
+            pool.put(detector)
+
+    def detect(self, image, dictionary: str = DEFAULT_DICTIONARY, profile: str = DEFAULT_PROFILE):
+        """Detect markers in an image. Returns (corners, ids, rejected)"""
+        with self.acquire(dictionary, profile) as detector:
+            return detector.detectMarkers(image)
+
+    def keys(self):
+        return list(self._pools.keys())
+
+
+detector_pool = DetectorPool()
+detector_pool.build()
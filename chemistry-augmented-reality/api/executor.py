@@ -0,0 +1,116 @@
+"""
+Executor layer that keeps CPU-bound frame work off the event loop
+"""
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+import cv2
+
+# Deployment configuration
+EXECUTOR_KIND = os.environ.get("FRAME_EXECUTOR", "thread")
+WORKERS = int(os.environ.get("FRAME_WORKERS", os.cpu_count() or 1))
+QUEUE_DEPTH = int(os.environ.get("FRAME_QUEUE_DEPTH", WORKERS * 4))
+
+
+class ExecutorBusyError(RuntimeError):
+    """Every worker is busy and the wait queue is full"""
+
+
+class DeadlineExceededError(RuntimeError):
+    """The job's deadline passed before a worker could start it"""
+
+
+def _init_process_worker():
+    # One frame per process already uses every core; avoid oversubscribing
+    # them with OpenCV's internal thread pool.
+    cv2.setNumThreads(1)
+    # OpenGL contexts cannot cross processes; each worker builds its own
+    from api.render import render_pool
+    render_pool.start()
+
+
+def _run_before_deadline(deadline: float, fn, *args, **kwargs):
+    """Run fn unless its time.monotonic() deadline has passed. The monotonic
+    clock is system-wide, so deadlines carry over to worker processes"""
+    if time.monotonic() >= deadline:
+        raise DeadlineExceededError("Request deadline passed while the frame was queued")
+    return fn(*args, **kwargs)
+
+
+def _run_in_process(fn, *args, **kwargs):
+    """Run fn in a worker process, returning buffers as picklable bytes"""
+    result = fn(*args, **kwargs)
+    if isinstance(result, tuple):
+        return tuple(bytes(value) if isinstance(value, memoryview) else value for value in result)
+    return bytes(result) if isinstance(result, memoryview) else result
+
+
+class FrameExecutor:
+    """
+    Runs frame processing jobs on a thread or process pool.
+
+    At most `workers` jobs run at once and at most `queue_depth` more wait
+    for a free worker; further submissions fail fast with ExecutorBusyError.
+    Jobs submitted with a deadline are dropped with DeadlineExceededError
+    when it passes before a worker picks them up.
+    The counters are only touched from the event loop, so they need no lock.
+    """
+
+    def __init__(self, kind: str = EXECUTOR_KIND, workers: int = WORKERS, queue_depth: int = QUEUE_DEPTH):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.queue_depth = max(0, queue_depth)
+        self.pending = 0
+        self._executor: Executor | None = None
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        if self.kind == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_process_worker
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="frame-worker"
+            )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def queued(self) -> int:
+        """Jobs waiting for a free worker"""
+        return max(0, self.pending - self.workers)
+
+    async def run(self, fn, *args, deadline: float | None = None, **kwargs):
+        """Run fn(*args, **kwargs) on the pool and await its result"""
+        if self.pending >= self.workers + self.queue_depth:
+            raise ExecutorBusyError("Frame executor is saturated")
+        if deadline is not None:
+            if time.monotonic() >= deadline:
+                raise DeadlineExceededError("Request deadline passed before the frame was queued")
+            fn = functools.partial(_run_before_deadline, deadline, fn)
+        self.start()
+        if self.kind == "process":
+            # Memoryviews cannot be pickled, so buffers cross the process boundary as bytes
+            args = tuple(bytes(arg) if isinstance(arg, memoryview) else arg for arg in args)
+            fn = functools.partial(_run_in_process, fn)
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(fn, *args, **kwargs)
+            )
+        finally:
+            self.pending -= 1
+
+
+frame_executor = FrameExecutor()
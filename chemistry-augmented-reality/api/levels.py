@@ -0,0 +1,108 @@
+"""
+Precompiled level tables for the Chemistry AR API.
+
+levels.yaml is compiled once into a lookup table per level, so labelling a
+detected marker is a single dict lookup on the hot path.
+"""
+import os
+import threading
+from dataclasses import dataclass, field
+
+import yaml
+
+LEVELS_FILE = os.path.join(os.path.dirname(__file__), "..", "chemistry_ar", "data", "levels.yaml")
+
+REQUIRED_COLOR = (0, 255, 255) # Yellow
+OPTIONAL_COLOR = (200, 200, 200) # Gray
+UNKNOWN_COLOR = (0, 255, 0) # Green
+
+
+@dataclass(frozen=True)
+class MarkerLabel:
+    label: str
+    color: tuple
+    required: bool
+    # (element, count) pairs, used by the 3D overlay
+    atoms: tuple = ()
+
+
+@dataclass(frozen=True)
+class LevelTable:
+    """Marker id -> label lookup of one level, plus its required marker count"""
+    number: int
+    objective: str
+    smiles: str
+    markers: dict[int, MarkerLabel] = field(default_factory=dict)
+    required_count: int = 0
+
+
+def compile_level(number: int, level_data: dict) -> LevelTable:
+    """Build the lookup table of one level from its levels.yaml entry"""
+    markers = {}
+    for marker_id, marker_info in enumerate(level_data.get("markers", [])):
+        atoms = marker_info.get("atoms", [])
+        required = marker_info.get("required", False)
+        markers[marker_id] = MarkerLabel(
+            label="+".join(f"{a['count']}{a['element']}" for a in atoms),
+            color=REQUIRED_COLOR if required else OPTIONAL_COLOR,
+            required=required,
+            atoms=tuple((a['element'], a['count']) for a in atoms),
+        )
+
+    objective = level_data.get("objective", {})
+    return LevelTable(
+        number=number,
+        objective=objective.get("name", "Unknown"),
+        smiles=objective.get("smiles", ""),
+        markers=markers,
+        required_count=sum(1 for m in markers.values() if m.required),
+    )
+
+
+class LevelRegistry:
+    """
+    Compiled tables of every level. A reload compiles the new tables aside
+    and swaps them in with a single assignment, so readers see either the
+    old or the new set of levels, never a mix.
+    """
+
+    def __init__(self, path: str = LEVELS_FILE):
+        self.path = path
+        self.tables: tuple[LevelTable, ...] = ()
+        # Bumped on every load, so results derived from old tables can be told apart
+        self.version = 0
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """(Re)compile every level from the YAML file"""
+        with self._lock:
+            tables = ()
+            mtime = None
+            if os.path.exists(self.path):
+                mtime = os.path.getmtime(self.path)
+                with open(self.path, 'r') as f:
+                    data = yaml.safe_load(f)
+                if data and 'levels' in data:
+                    tables = tuple(compile_level(i, level) for i, level in enumerate(data['levels']))
+            self.tables, self._mtime = tables, mtime
+            self.version += 1
+
+    def reload_if_changed(self) -> bool:
+        """Reload when the YAML file was modified. Returns whether it reloaded"""
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime == self._mtime:
+            return False
+        self.load()
+        return True
+
+    def get(self, level: int) -> LevelTable | None:
+        tables = self.tables
+        return tables[level] if 0 <= level < len(tables) else None
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+
+level_registry = LevelRegistry()
+level_registry.load()
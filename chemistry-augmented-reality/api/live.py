@@ -0,0 +1,40 @@
+"""
+Helpers for live frame streams
+"""
+import asyncio
+
+
+class LatestFrameSlot:
+    """
+    Single-slot mailbox between a frame producer and a consumer.
+
+    A new frame replaces any frame that has not been taken yet, so the
+    consumer always processes the newest frame and latency stays bounded
+    when the producer is faster than the consumer.
+    """
+
+    def __init__(self):
+        self._frame = None
+        self._event = asyncio.Event()
+        self.closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, frame) -> None:
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = frame
+        self.received += 1
+        self._event.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._event.set()
+
+    async def get(self):
+        """Wait for the newest frame. Returns None once the slot is closed"""
+        while self._frame is None and not self.closed:
+            await self._event.wait()
+            self._event.clear()
+        frame, self._frame = self._frame, None
+        return frame
@@ -1,21 +1,58 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import StreamingResponse, HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Depends, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.requests import HTTPConnection, Request
+from fastapi.concurrency import run_in_threadpool
+import zipfile
+from fastapi.responses import StreamingResponse, HTMLResponse, JSONResponse, PlainTextResponse, FileResponse
+from starlette.background import BackgroundTask
 from fastapi.middleware.cors import CORSMiddleware
-import cv2
-import numpy as np
-import io
+from contextlib import asynccontextmanager, AsyncExitStack
+import asyncio
+import json
+import time
 import sys
 import os
-import yaml
 
 # Add parent directory to path to import chemistry_ar modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
+from api.executor import frame_executor, ExecutorBusyError, DeadlineExceededError
+from api.admission import admission, OverloadedError, ClientLimitError, DEADLINE_HEADER
+from api.cache import result_cache
+from api.assets import static_assets, asset_response, make_asset, CACHE_IMMUTABLE, INDEX_FILE
+from api.uploads import read_upload, UPLOAD_OPENAPI, UploadTooLargeError, InvalidUploadError
+from api.pipeline import process_image, detect_image, FrameOptions, InvalidFrameError
+from api.live import LatestFrameSlot
+from api.batch import read_batch, stream_batch, BATCH_UPLOAD_OPENAPI, BatchTooLargeError
+from api.video import (analyze_video, spool_upload, video_slot, VIDEO_FORMATS, VIDEO_UPLOAD_OPENAPI,
+                       VideoTooLargeError, InvalidVideoError, VideoBusyError)
+from api.levels import level_registry, LevelTable
+from api.render import render_pool
+from api.warmup import readiness
+from api.metrics import registry, observe_stages, server_timing, stage_seconds, admission_rejected, MetricsMiddleware
+from api.stream import stream_hub, BOUNDARY, StreamUnavailableError
+from api.sessions import Session, session_store, SESSION_COOKIE, SESSION_HEADER
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Contexts and shaders are built once, before any request
+    if frame_executor.kind == "thread":
+        render_pool.start()
+    frame_executor.start()
+    # Warm up in the background: /health answers at once, /ready once warm
+    warm_up_task = asyncio.create_task(readiness.run_in(frame_executor))
+    yield
+    warm_up_task.cancel()
+    stream_hub.stop_all()
+    frame_executor.shutdown()
+    render_pool.shutdown()
+
+
 app = FastAPI(
     title="Chemistry AR API",
     description="Augmented Reality Chemistry Game API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware to allow requests from web clients
@@ -27,35 +64,94 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Static files directory - handle both local and Heroku paths
-static_dir = os.path.join(os.path.dirname(__file__), "static")
-if os.path.exists(static_dir):
-    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+# Count requests by route and status code
+app.add_middleware(MetricsMiddleware)
 
-# Load levels data from YAML
-levels_file = os.path.join(os.path.dirname(__file__), "..", "chemistry_ar", "data", "levels.yaml")
-levels_data = []
-current_level = 0
+def get_session(connection: HTTPConnection, response: Response) -> Session:
+    """
+    Load the client's game state. Clients are identified by the X-Session-ID
+    header or the session cookie; new clients get a fresh session id.
+    """
+    session_id = connection.headers.get(SESSION_HEADER) or connection.cookies.get(SESSION_COOKIE)
+    session = Session(session_store, session_id)
+    # Endpoints that build their own Response attach the session again
+    session.attach(response)
+    return session
 
-if os.path.exists(levels_file):
-    with open(levels_file, 'r') as f:
-        data = yaml.safe_load(f)
-        if data and 'levels' in data:
-            levels_data = data['levels']
 
-WIDTH, HEIGHT = 1280, 720
+def client_key(connection: HTTPConnection, session: Session) -> str:
+    """Identity of a client for the per-client admission limit"""
+    if not session.is_new:
+        return f"session:{session.id}"
+    # Clients on their first request are told apart by address. uvicorn only
+    # takes it from X-Forwarded-For for the proxies in FORWARDED_ALLOW_IPS
+    return f"address:{connection.client.host if connection.client else 'unknown'}"
+
+
+def _admission_rejected(e: OverloadedError) -> HTTPException:
+    """429 (client limit) or 503 (server busy) answer to a request turned away by admission"""
+    if isinstance(e, ClientLimitError):
+        admission_rejected.inc("client_limit")
+        return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    admission_rejected.inc("overloaded")
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+def _require_level(level: int) -> LevelTable:
+    """Lookup table of a level, or 400 when there is no such level"""
+    level_table = level_registry.get(level)
+    if level_table is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid level number. Must be between 0 and {len(level_registry) - 1}"
+        )
+    return level_table
+
+
+def frame_options(
+    resize: str = Query("fixed", pattern="^(fixed|fit|native)$"),
+    format: str = Query("jpeg", pattern="^(jpeg|webp|png)$"),
+    quality: int | None = Query(None, ge=1, le=100),
+    max_width: int | None = Query(None, ge=16),
+    overlay: str = Query("2d", pattern="^(2d|3d)$")
+) -> FrameOptions:
+    """
+    Detection size and output encoding options shared by the frame endpoints.
+    
+    Args:
+        resize: "fixed" stretches to 1280x720, "fit" only shrinks larger
+            images, "native" detects on the uploaded resolution
+        format: Output codec (jpeg, webp or png)
+        quality: JPEG/WebP quality from 1 to 100
+        max_width: Downscale the returned image to at most this width
+        overlay: "3d" also renders the atoms of every marker (RENDER_BACKEND)
+    """
+    if overlay == "3d" and not render_pool.enabled:
+        raise HTTPException(status_code=400, detail="3D overlay rendering is not enabled")
+    return FrameOptions(resize=resize, format=format, quality=quality, max_width=max_width, overlay=overlay)
 
 
 @app.get("/", response_class=HTMLResponse)
-async def root():
+async def root(request: Request):
     """Serve the main web interface"""
-    index_file = os.path.join(os.path.dirname(__file__), "static", "index.html")
-    if os.path.exists(index_file):
-        with open(index_file, "r", encoding="utf-8") as f:
-            return f.read()
+    index = static_assets.get(INDEX_FILE)
+    if index is not None:
+        return asset_response(request, index)
     return HTMLResponse(content="<h1>Chemistry AR API</h1><p>Visit <a href='/docs'>/docs</a> for API documentation.</p>")
 
 
+@app.api_route("/static/{name:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def static_file(name: str, request: Request, v: str | None = None):
+    """Serve the script and stylesheet of the web interface from memory"""
+    asset = static_assets.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    # URLs versioned with the current content hash never change content
+    if static_assets.is_current(name, v):
+        return asset_response(request, asset, CACHE_IMMUTABLE)
+    return asset_response(request, asset)
+
+
 @app.get("/health")
 async def health_check():
     """API health check endpoint"""
@@ -66,119 +162,363 @@ async def health_check():
     }
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness check: 503 until the startup warm-up has finished"""
+    return JSONResponse(content=readiness.status(), status_code=200 if readiness.ready else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: per-stage latency, request counts and executor load"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/levels")
-async def get_levels():
+async def get_levels(request: Request, session: Session = Depends(get_session)):
     """Get information about available levels"""
-    global current_level
-    objective = "Unknown"
-    if levels_data and current_level < len(levels_data):
-        objective = levels_data[current_level].get("objective", {}).get("name", "Unknown")
+    # Pick up edits to levels.yaml; the new tables are swapped in atomically
+    level_registry.reload_if_changed()
+    current_level = session.level
+    level = level_registry.get(current_level)
+    objective = level.objective if level is not None else "Unknown"
     
-    return {
-        "total_levels": len(levels_data),
+    body = json.dumps({
+        "total_levels": len(level_registry),
         "current_level": current_level,
         "current_objective": objective
-    }
+    }, separators=(",", ":")).encode("utf-8")
+    # The answer depends on the session, so only the client itself may cache it
+    return session.attach(asset_response(request, make_asset(body, "application/json"), "private, no-cache"))
 
 
-@app.post("/process_frame")
-async def process_frame(file: UploadFile = File(...)):
+@app.post("/process_frame", openapi_extra=UPLOAD_OPENAPI)
+async def process_frame(
+    request: Request,
+    output: str = Query("image", pattern="^(image|json)$"),
+    options: FrameOptions = Depends(frame_options),
+    session: Session = Depends(get_session)
+):
     """
     Process an image frame and detect ArUco markers.
     
     Args:
-        file: Image file (JPEG, PNG, etc.)
+        request: Multipart form with the image in its "file" field, or the
+            raw image bytes (JPEG, PNG, etc.), at most MAX_UPLOAD_BYTES
+        output: "image" for the annotated frame, "json" for the detection
+            result only (no drawing or encoding)
+        options: Detection size and output codec, quality and size
+        session: Game state of the client (selects the level)
         
     Returns:
-        Processed image with detected ArUco markers highlighted
+        Processed image with detected ArUco markers highlighted, or the
+        detected markers as JSON. Repeated uploads are served from the
+        result cache (X-Cache: HIT)
     """
     try:
-        # Read uploaded file
-        contents = await file.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if frame is None:
-            raise HTTPException(status_code=400, detail="Invalid image file")
-        
-        # Resize frame to expected dimensions
-        frame = cv2.resize(frame, (WIDTH, HEIGHT))
-        
-        # Detect ArUco markers
-        aruco_dict = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_6X6_250)
-        aruco_params = cv2.aruco.DetectorParameters()
-        corners, ids, rejected = cv2.aruco.detectMarkers(frame, aruco_dict, parameters=aruco_params)
-        
-        # Draw detected markers
-        if ids is not None:
-            cv2.aruco.drawDetectedMarkers(frame, corners, ids)
-            
-            # Get current level markers info
-            current_level_data = levels_data[current_level] if levels_data and current_level < len(levels_data) else None
-            level_markers = current_level_data.get("markers", []) if current_level_data else []
-            
-            detected_required_count = 0
-            total_required_count = sum(1 for m in level_markers if m.get("required", False))
-            
-            # Add text labels for detected markers
-            for i, corner in enumerate(corners):
-                marker_id = ids[i][0]
-                center = corner[0].mean(axis=0).astype(int)
-                
-                # Determine label based on level data
-                label = f"ID: {marker_id}"
-                color = (0, 255, 0) # Green
+        # Admitted before the upload is read, so saturated servers answer at once
+        async with admission.admit(client_key(request, session), request.headers.get(DEADLINE_HEADER)) as deadline:
+            # Stream the upload into a pooled buffer and decode straight from it
+            start = time.perf_counter()
+            async with read_upload(request) as contents:
+                upload_read = time.perf_counter() - start
+                stage_seconds.observe(upload_read, "upload_read")
                 
-                if marker_id < len(level_markers):
-                    marker_info = level_markers[marker_id]
-                    atoms = marker_info.get("atoms", [])
-                    atom_names = [f"{a['count']}{a['element']}" for a in atoms]
-                    label = "+".join(atom_names)
-                    
-                    if marker_info.get("required", False):
-                        detected_required_count += 1
-                        color = (0, 255, 255) # Yellow for required
-                    else:
-                        color = (200, 200, 200) # Gray for optional
+                # Repeated uploads are answered without decoding
+                level_table = level_registry.get(session.level)
+                cache_key = None
+                if result_cache.enabled:
+                    cache_key = await result_cache.key(contents, (level_registry.version, session.level), output, options)
+                    cached = result_cache.get(cache_key)
+                    if cached is not None:
+                        return session.attach(Response(
+                            content=cached.body,
+                            media_type=cached.media_type,
+                            headers={"X-Cache": "HIT"}
+                        ))
                 
-                cv2.putText(frame, label, (center[0], center[1] - 10),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1.5, color, 3)
+                if output == "json":
+                    detection, timings = await frame_executor.run(
+                        detect_image, contents, level_table, options, deadline=deadline
+                    )
+                    observe_stages(timings)
+                    response = JSONResponse(content=detection)
+                else:
+                    # Decode, detect, annotate and encode off the event loop; the
+                    # encoded buffer is sent as is
+                    encoded_img, timings = await frame_executor.run(
+                        process_image, contents, level_table, options, deadline=deadline
+                    )
+                    observe_stages(timings)
+                    response = Response(content=encoded_img, media_type=options.media_type)
+            response.headers["X-Cache"] = "MISS"
+            # Per-stage timings for clients and load tests
+            response.headers["Server-Timing"] = server_timing({"upload_read": upload_read, **timings})
             
-            # Check if objective is met (simple check: are all required markers visible?)
-            # This is a simplification. Real engine checks distance/reaction.
-            if detected_required_count >= total_required_count and total_required_count > 0:
-                cv2.putText(frame, "OBJECTIVE MET!", (50, 100), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 2.5, (0, 255, 0), 5)
-                
-        # Encode as JPEG
-        success, encoded_img = cv2.imencode('.jpg', frame)
+            if cache_key is not None:
+                result_cache.put(cache_key, response.body, response.media_type)
+            return session.attach(response)
         
-        if not success:
-            raise HTTPException(status_code=500, detail="Failed to encode image")
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (InvalidUploadError, InvalidFrameError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OverloadedError as e:
+        raise _admission_rejected(e)
+    except (ExecutorBusyError, DeadlineExceededError) as e:
+        admission_rejected.inc("deadline" if isinstance(e, DeadlineExceededError) else "executor_busy")
+        retry_after = admission.retry_after(frame_executor.pending)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(retry_after)})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing frame: {str(e)}")
+
+
+@app.post("/process_batch", openapi_extra=BATCH_UPLOAD_OPENAPI)
+async def process_batch(
+    request: Request,
+    level: int | None = None,
+    output: str = Query("json", pattern="^(image|json)$"),
+    options: FrameOptions = Depends(frame_options),
+    session: Session = Depends(get_session)
+):
+    """
+    Process many images in one request.
+    
+    Args:
+        request: Multipart form with image files, or zip archives of images,
+            in its "files" field
+        level: Level used to label the markers (the session's level by default)
+        output: "json" for the detection results, "image" to also include
+            the annotated image as base64
+        options: Detection size and output codec, quality and size
+        session: Game state of the client
         
-        # Return as streaming response
-        return StreamingResponse(
-            io.BytesIO(encoded_img.tobytes()),
-            media_type="image/jpeg"
-        )
+    Returns:
+        One JSON object per line (NDJSON), streamed as each image finishes.
+        The request holds one admission slot until the stream ends, and
+        images that wait longer than the request deadline report an error
+    """
+    if level is None:
+        level = session.level
+    level_table = _require_level(level)
+    
+    timeout = admission.timeout(request.headers.get(DEADLINE_HEADER))
+    async with AsyncExitStack() as slot:
+        try:
+            await slot.enter_async_context(admission.admit(client_key(request, session), timed=False))
+            images = await read_batch(request)
+        except OverloadedError as e:
+            raise _admission_rejected(e)
+        except BatchTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except InvalidUploadError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except zipfile.BadZipFile as e:
+            raise HTTPException(status_code=400, detail=f"Invalid zip file: {str(e)}")
+        # The stream releases the slot when it ends; the background task
+        # covers a stream that never started
+        release = slot.pop_all().aclose
+    
+    return session.attach(StreamingResponse(
+        stream_batch(images, level_table, output, options, timeout, release),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(release)
+    ))
+
+
+@app.post("/process_video", openapi_extra=VIDEO_UPLOAD_OPENAPI)
+async def process_video(
+    request: Request,
+    level: int | None = None,
+    output: str = Query("json", pattern="^(json|video)$"),
+    format: str = Query("webm", pattern="^(webm|mp4)$"),
+    resize: str = Query("fit", pattern="^(fixed|fit|native)$"),
+    session: Session = Depends(get_session)
+):
+    """
+    Detect markers on every frame of a short video clip.
+    
+    Args:
+        request: Multipart form with the video (MP4, WebM, etc.) in its "file"
+            field, or the raw video bytes, at most MAX_VIDEO_BYTES
+        level: Level used to label the markers (the session's level by default)
+        output: "json" for the marker timeline, "video" for the annotated video
+        format: Container of the annotated video ("webm" or "mp4")
+        resize: Detection size of the frames (see FrameOptions)
+        session: Game state of the client
         
+    Returns:
+        JSON timeline (markers per frame timestamp and when the objective was
+        first met), or the annotated video. The request holds one admission
+        slot while the video is uploaded and processed
+    """
+    if level is None:
+        level = session.level
+    level_table = _require_level(level)
+    
+    options = FrameOptions(resize=resize)
+    output_path = None
+    try:
+        # No deadline: videos are decoded on their own thread, not the frame executor
+        async with admission.admit(client_key(request, session), timed=False), video_slot():
+            path = await spool_upload(request)
+            try:
+                if output == "video":
+                    output_path = path + f".annotated.{format}"
+                timeline = await asyncio.to_thread(analyze_video, path, level_table, options, output_path, format)
+            finally:
+                os.unlink(path)
+    except OverloadedError as e:
+        raise _admission_rejected(e)
+    except VideoBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except VideoTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (InvalidVideoError, InvalidUploadError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing frame: {str(e)}")
+        if output_path is not None and os.path.exists(output_path):
+            os.unlink(output_path)
+        raise HTTPException(status_code=500, detail=f"Error processing video: {str(e)}")
+    
+    if output_path is None:
+        return session.attach(JSONResponse(content=timeline))
+    
+    headers = {"X-Frames": str(timeline["frames"])}
+    if timeline["objective_met_at"] is not None:
+        headers["X-Objective-Met-At"] = f"{timeline['objective_met_at']:.3f}"
+    return session.attach(FileResponse(
+        output_path,
+        media_type=VIDEO_FORMATS[format][1],
+        headers=headers,
+        background=BackgroundTask(os.unlink, output_path)
+    ))
+
+
+@app.websocket("/ws/frames")
+async def frames_socket(
+    websocket: WebSocket,
+    output: str = "image",
+    options: FrameOptions = Depends(frame_options),
+    session: Session = Depends(get_session)
+):
+    """
+    Stream frames over one persistent socket.
+    
+    The client sends encoded images as binary messages and receives the
+    processed frames back, or JSON detection results with ?output=json.
+    When frames arrive faster than they can be processed, only the newest
+    one is kept and the stale ones are dropped. Level changes made through
+    /set_level apply from the next frame. Each frame goes through admission
+    control like a /process_frame request; frames turned away or past their
+    deadline are dropped. A text message closes the socket with code 1003.
+    """
+    if output not in ("image", "json"):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    key = client_key(websocket, session)
+    slot = LatestFrameSlot()
+
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is None:
+                    # Frames are binary messages, anything else ends the stream
+                    await websocket.close(code=1003, reason="Frames must be sent as binary messages")
+                    break
+                slot.put(message["bytes"])
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            slot.close()
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while (contents := await slot.get()) is not None:
+            await run_in_threadpool(session.refresh)
+            level = level_registry.get(session.level)
+            try:
+                # Every frame is admitted like a /process_frame request
+                async with admission.admit(key, websocket.headers.get(DEADLINE_HEADER)) as deadline:
+                    if output == "json":
+                        detection, timings = await frame_executor.run(
+                            detect_image, contents, level, options, deadline=deadline
+                        )
+                    else:
+                        encoded_img, timings = await frame_executor.run(
+                            process_image, contents, level, options, deadline=deadline
+                        )
+                observe_stages(timings)
+            except InvalidFrameError as e:
+                await websocket.send_json({"error": str(e)})
+                continue
+            except OverloadedError as e:
+                # The next frame will replace this one anyway
+                admission_rejected.inc("client_limit" if isinstance(e, ClientLimitError) else "overloaded")
+                continue
+            except (ExecutorBusyError, DeadlineExceededError) as e:
+                admission_rejected.inc("deadline" if isinstance(e, DeadlineExceededError) else "executor_busy")
+                continue
+            if output == "json":
+                await websocket.send_json(detection)
+            else:
+                await websocket.send_bytes(encoded_img)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        receiver.cancel()
+
+
+@app.get("/streams")
+async def list_streams():
+    """List the server-side video sources available as MJPEG streams"""
+    return {"streams": sorted(stream_hub.sources)}
+
+
+@app.get("/stream/{name}")
+async def video_stream(name: str, level: int | None = None, session: Session = Depends(get_session)):
+    """
+    Stream annotated frames of a server-side video source as MJPEG.
+    
+    Args:
+        name: Source name from STREAM_SOURCES
+        level: Level used for the labels (the session's level by default).
+            Viewers of a source share one stream, so the latest viewer's level wins
+        
+    Returns:
+        multipart/x-mixed-replace stream of JPEG frames; 503 when the source
+        cannot be opened or read
+    """
+    if name not in stream_hub.sources:
+        raise HTTPException(status_code=404, detail=f"Unknown stream: {name}")
+    if level is None:
+        level = session.level
+    _require_level(level)
+    
+    try:
+        source = await stream_hub.open(name, level)
+    except StreamUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return StreamingResponse(
+        stream_hub.stream(source),
+        media_type=f"multipart/x-mixed-replace; boundary={BOUNDARY}"
+    )
 
 
 @app.post("/set_level/{level_number}")
-async def set_level(level_number: int):
-    """Set the current game level"""
-    global current_level
+def set_level(level_number: int, session: Session = Depends(get_session)):
+    """Set the current game level of the client's session"""
     try:
-        if level_number < 0 or level_number >= len(levels_data):
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid level number. Must be between 0 and {len(levels_data) - 1}"
-            )
+        level_registry.reload_if_changed()
+        level = _require_level(level_number)
         
-        current_level = level_number
-        objective = levels_data[level_number].get("objective", {}).get("name", "Unknown")
+        session.level = level_number
+        objective = level.objective
         
         return {
             "status": "success",
@@ -0,0 +1,242 @@
+"""
+Prometheus metrics for the Chemistry AR API.
+
+Metrics are only updated from the event loop: pipeline workers time their
+own stages and hand the timings back with the result. Recording a value is
+a dict lookup and an addition, so it costs next to nothing on the hot path.
+"""
+import bisect
+import time
+from abc import ABC, abstractmethod
+
+from api.admission import admission
+from api.cache import result_cache
+from api.executor import frame_executor
+
+PREFIX = "chemistry_ar_"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels=()):
+        self.name = PREFIX + name
+        self.description = description
+        self.label_names = tuple(labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        ...
+
+
+class Counter(Metric):
+    """Counter that is either incremented directly or read from a callback at scrape time"""
+
+    kind = "counter"
+
+    def __init__(self, name, description, labels=(), callback=None):
+        super().__init__(name, description, labels)
+        self.values: dict[tuple, float] = {}
+        self.callback = callback
+
+    def inc(self, *label_values, amount=1) -> None:
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        if self.callback is not None:
+            return [f"{self.name} {_format_value(self.callback())}"]
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in sorted(self.values.items())
+        ]
+
+
+class Gauge(Metric):
+    """Gauge that is either set directly or read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name, description, labels=(), callback=None):
+        super().__init__(name, description, labels)
+        self.values: dict[tuple, float] = {}
+        self.callback = callback
+
+    def inc(self, *label_values, amount=1) -> None:
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount=1) -> None:
+        self.values[label_values] = self.values.get(label_values, 0) - amount
+
+    def set(self, *label_values, value) -> None:
+        self.values[label_values] = value
+
+    def samples(self):
+        if self.callback is not None:
+            return [f"{self.name} {_format_value(self.callback())}"]
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in sorted(self.values.items())
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self.values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        entry = self.values.get(label_values)
+        if entry is None:
+            entry = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def samples(self):
+        lines = []
+        for key, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format_value(float(bound))
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.label_names, key, [('le', le)])} {cumulative}"
+                )
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_seconds = registry.register(Histogram(
+    "stage_seconds", "Time spent in each frame processing stage", labels=("stage",)
+))
+request_seconds = registry.register(Histogram(
+    "request_seconds", "HTTP request latency", labels=("path",)
+))
+requests_total = registry.register(Counter(
+    "requests_total", "HTTP requests by path and status code", labels=("path", "status")
+))
+requests_in_flight = registry.register(Gauge(
+    "requests_in_flight", "HTTP requests being handled"
+))
+registry.register(Gauge(
+    "executor_in_flight", "Frames being processed by executor workers",
+    callback=lambda: frame_executor.pending - frame_executor.queued
+))
+registry.register(Gauge(
+    "executor_queue_depth", "Frames waiting for a free executor worker",
+    callback=lambda: frame_executor.queued
+))
+registry.register(Gauge(
+    "executor_workers", "Executor worker count",
+    callback=lambda: frame_executor.workers
+))
+registry.register(Gauge(
+    "admission_in_flight", "Frame requests admitted and not finished yet",
+    callback=lambda: admission.in_flight
+))
+admission_rejected = registry.register(Counter(
+    "admission_rejected_total", "Frame requests rejected or dropped by admission control", labels=("reason",)
+))
+registry.register(Counter(
+    "result_cache_hits_total", "Frames answered from the result cache",
+    callback=lambda: result_cache.hits
+))
+registry.register(Counter(
+    "result_cache_misses_total", "Frames not found in the result cache",
+    callback=lambda: result_cache.misses
+))
+registry.register(Counter(
+    "result_cache_evictions_total", "Results evicted from the result cache",
+    callback=lambda: result_cache.evictions
+))
+registry.register(Gauge(
+    "result_cache_entries", "Results held in the result cache",
+    callback=lambda: len(result_cache)
+))
+registry.register(Gauge(
+    "result_cache_bytes", "Size of the results held in the result cache",
+    callback=lambda: result_cache.size
+))
+
+
+def observe_stages(timings: dict) -> None:
+    """Record the stage timings returned by the pipeline"""
+    for stage, seconds in timings.items():
+        stage_seconds.observe(seconds, stage)
+
+
+def server_timing(timings: dict) -> str:
+    """Server-Timing header value of the stage timings, in milliseconds"""
+    return ", ".join(f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in timings.items())
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting HTTP requests by route and status code"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        start = time.perf_counter()
+        requests_in_flight.inc()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight.dec()
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            path = route.path if route is not None else "other"
+            requests_total.inc(path, str(status))
+            request_seconds.observe(time.perf_counter() - start, path)
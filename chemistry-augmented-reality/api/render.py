@@ -0,0 +1,291 @@
+"""
+Headless rendering of the desktop app's 3D atom overlay.
+
+Each renderer owns a standalone OpenGL context (EGL by default, so no
+display is needed) with the sphere shader compiled and the sphere mesh
+uploaded once, plus a framebuffer and background texture per frame size.
+A pool of renderers is built at startup and checked out per frame, so no
+request ever creates a context or compiles a shader.
+
+Requires the optional `moderngl` package and an EGL driver (libegl1).
+"""
+import functools
+import os
+import queue
+import threading
+import tomllib
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+try:
+    import moderngl
+except ImportError:  # optional dependency
+    moderngl = None
+
+from api.levels import LevelTable
+from chemistry_ar import camera
+from chemistry_ar.utils import circumference_points
+
+# Deployment configuration: "egl" (headless) or "x11"; empty disables 3D overlays
+RENDER_BACKEND = os.environ.get("RENDER_BACKEND", "")
+RENDER_POOL_SIZE = int(os.environ.get("RENDER_POOL_SIZE", 2))
+
+ATOMS_FILE = os.path.join(os.path.dirname(__file__), "..", "chemistry_ar", "data", "atoms.toml")
+
+# Placement of the atoms, as in chemistry_ar.engine and chemistry_ar.molecule
+MARKER_SIZE = 0.48
+ATOM_OFFSET = np.array([0.0, 0.0, 0.5])
+ATOM_RING_RADIUS = 0.2
+NEAR_PLANE, FAR_PLANE = 1.0, 1000.0
+
+# Shaders of chemistry_ar.shapes.sphere, with the radius applied in the
+# vertex shader so every atom shares one unit sphere mesh
+SPHERE_VERTEX_SHADER = """
+#version 330
+
+uniform mat4 m_view;
+uniform mat4 m_proj;
+uniform float radius;
+
+in vec3 in_position;
+in vec3 in_normal;
+
+out vec3 pos;
+out vec3 normal;
+
+void main() {
+    vec4 VxM = m_view * vec4(in_position * radius, 1.0);
+    gl_Position =  m_proj * VxM;
+    mat3 m_normal = inverse(transpose(mat3(m_view)));
+    normal = m_normal * normalize(in_normal);
+    pos = VxM.xyz;
+}
+"""
+
+SPHERE_FRAGMENT_SHADER = """
+#version 330
+
+uniform vec4 color;
+
+in vec3 pos;
+in vec3 normal;
+
+out vec4 fragColor;
+
+void main() {
+    float l = dot(normalize(-pos), normalize(normal));
+    fragColor = color * (0.25 + abs(l) * 0.75);
+}
+"""
+
+# Shaders of chemistry_ar.shapes.rectangle (camera frame as background)
+BACKGROUND_VERTEX_SHADER = """
+#version 330
+in vec2 in_vert;
+out vec2 frag_texcoord;
+void main() {
+    frag_texcoord = in_vert * 0.5 + 0.5;
+    gl_Position = vec4(in_vert, 0.0, 1.0);
+}
+"""
+
+BACKGROUND_FRAGMENT_SHADER = """
+#version 330
+uniform sampler2D frame;
+in vec2 frag_texcoord;
+out vec4 fragColor;
+void main() {
+    fragColor = texture(frame, frag_texcoord);
+}
+"""
+
+
+class RenderUnavailableError(RuntimeError):
+    """3D overlays are disabled or no OpenGL context could be created"""
+
+
+def sphere_mesh(sectors: int = 32, rings: int = 16) -> tuple[np.ndarray, np.ndarray]:
+    """Unit sphere as interleaved position/normal vertices and triangle indices
+    (the same mesh as moderngl_window.geometry.sphere)"""
+    r = np.arange(rings)[:, None] / (rings - 1)
+    s = np.arange(sectors)[None, :] / (sectors - 1)
+    y = np.sin(-np.pi / 2 + np.pi * r) * np.ones_like(s)
+    x = np.cos(2 * np.pi * s) * np.sin(np.pi * r)
+    z = np.sin(2 * np.pi * s) * np.sin(np.pi * r)
+    points = np.stack([x, y, z], axis=-1).reshape(-1, 3)
+    vertices = np.hstack([points, points]).astype("f4")
+
+    row, column = np.meshgrid(np.arange(rings - 1), np.arange(sectors - 1), indexing="ij")
+    a = (row * sectors + column).ravel()
+    b = ((row + 1) * sectors + column).ravel()
+    indices = np.stack([a, b + 1, a + 1, a, b, b + 1], axis=-1).astype("i4")
+    return vertices, indices
+
+
+@functools.lru_cache(maxsize=1)
+def load_atoms() -> dict:
+    with open(ATOMS_FILE, "rb") as f:
+        return tomllib.load(f)
+
+
+@functools.lru_cache(maxsize=256)
+def atom_layout(atoms: tuple) -> tuple:
+    """(offset, radius, BGRA color) of every atom drawn on a marker"""
+    atom_data = load_atoms()
+    elements = [element for element, count in atoms for _ in range(count)]
+    positions = circumference_points(1, len(elements)) * ATOM_RING_RADIUS + ATOM_OFFSET
+    layout = []
+    for element, position in zip(elements, positions):
+        info = atom_data[element]
+        red, green, blue = (np.asarray(info["color"], np.float32) / 255.0)
+        # Frames are BGR, so the colors are too
+        layout.append((position, float(info["size"]), np.array([blue, green, red, 1.0], "f4").tobytes()))
+    return tuple(layout)
+
+
+@functools.lru_cache(maxsize=16)
+def projection(width: int, height: int) -> bytes:
+    matrix, _ = camera.calibrationFor(width, height)
+    return camera.intrinsic2Project(
+        width, height, near_plane=NEAR_PLANE, far_plane=FAR_PLANE, MTX=matrix
+    ).astype("f4").tobytes()
+
+
+class OverlayRenderer:
+    """One headless OpenGL context with its programs, meshes and render targets"""
+
+    MAX_TARGETS = 4
+
+    def __init__(self, backend: str = RENDER_BACKEND):
+        if moderngl is None:
+            raise RenderUnavailableError("3D overlays require the 'moderngl' package")
+        self.ctx = moderngl.create_context(standalone=True, backend=backend)
+        with self.ctx:
+            self.sphere_program = self.ctx.program(
+                vertex_shader=SPHERE_VERTEX_SHADER, fragment_shader=SPHERE_FRAGMENT_SHADER
+            )
+            vertices, indices = sphere_mesh()
+            self.sphere = self.ctx.vertex_array(
+                self.sphere_program,
+                [(self.ctx.buffer(vertices), "3f 3f", "in_position", "in_normal")],
+                index_buffer=self.ctx.buffer(indices),
+            )
+            self.background_program = self.ctx.program(
+                vertex_shader=BACKGROUND_VERTEX_SHADER, fragment_shader=BACKGROUND_FRAGMENT_SHADER
+            )
+            quad = np.array([-1.0, 1.0, -1.0, -1.0, 1.0, 1.0, 1.0, -1.0], "f4")
+            self.background = self.ctx.vertex_array(
+                self.background_program, [(self.ctx.buffer(quad), "2f", "in_vert")]
+            )
+        # (width, height) -> (framebuffer, background texture, readback buffer)
+        self._targets: OrderedDict[tuple[int, int], tuple] = OrderedDict()
+
+    def _target(self, width: int, height: int):
+        target = self._targets.get((width, height))
+        if target is not None:
+            self._targets.move_to_end((width, height))
+            return target
+        framebuffer = self.ctx.framebuffer(
+            color_attachments=[self.ctx.renderbuffer((width, height), 3)],
+            depth_attachment=self.ctx.depth_renderbuffer((width, height)),
+        )
+        texture = self.ctx.texture((width, height), 3, alignment=1)
+        target = self._targets[(width, height)] = (framebuffer, texture, np.empty((height, width, 3), np.uint8))
+        while len(self._targets) > self.MAX_TARGETS:
+            _, evicted = self._targets.popitem(last=False)
+            evicted[0].release()
+            evicted[1].release()
+        return target
+
+    def render(self, frame, detection: dict, level: LevelTable | None) -> None:
+        """Draw the atoms of every labelled marker onto a BGR frame, in place"""
+        height, width = frame.shape[:2]
+        level_markers = level.markers if level is not None else {}
+        matrix, distortion = camera.calibrationFor(width, height)
+
+        with self.ctx:
+            framebuffer, texture, pixels = self._target(width, height)
+            framebuffer.use()
+            framebuffer.clear()
+
+            # OpenGL rows go bottom-up, so the frame is flipped on the way in and out
+            self.ctx.disable(moderngl.DEPTH_TEST | moderngl.CULL_FACE)
+            texture.write(cv2.flip(frame, 0), alignment=1)
+            texture.use(0)
+            self.background.render(moderngl.TRIANGLE_STRIP)
+
+            self.ctx.enable(moderngl.DEPTH_TEST | moderngl.CULL_FACE)
+            self.sphere_program["m_proj"].write(projection(width, height))
+            for marker, corner in zip(detection["markers"], detection["corners"]):
+                marker_label = level_markers.get(marker["id"])
+                if marker_label is None or not marker_label.atoms:
+                    continue
+                rvecs, tvecs = camera.solvePnPAruco(corner, MARKER_SIZE, matrix, distortion)
+                for offset, radius, color in atom_layout(marker_label.atoms):
+                    modelview = camera.extrinsic2ModelView(rvecs, tvecs[0][0], offset)
+                    self.sphere_program["m_view"].write(modelview.astype("f4").tobytes())
+                    self.sphere_program["radius"].value = radius
+                    self.sphere_program["color"].write(color)
+                    self.sphere.render()
+
+            framebuffer.read_into(pixels, components=3, alignment=1)
+        cv2.flip(pixels, 0, dst=frame)
+
+    def release(self) -> None:
+        for framebuffer, texture, _ in self._targets.values():
+            framebuffer.release()
+            texture.release()
+        self._targets.clear()
+        self.ctx.release()
+
+
+class RenderPool:
+    """
+    Renderers built once and shared by the frame workers. A worker checks
+    one out for the duration of a frame, so contexts are never shared.
+    """
+
+    def __init__(self, backend: str = RENDER_BACKEND, size: int = RENDER_POOL_SIZE):
+        self.backend = backend
+        self.size = max(1, size)
+        self._renderers: queue.Queue | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.backend) and moderngl is not None
+
+    @property
+    def running(self) -> bool:
+        return self._renderers is not None
+
+    def start(self) -> None:
+        """Create the contexts and compile the shaders"""
+        with self._lock:
+            if self._renderers is not None or not self.enabled:
+                return
+            renderers = queue.Queue(maxsize=self.size)
+            for _ in range(self.size):
+                renderers.put(OverlayRenderer(self.backend))
+            self._renderers = renderers
+
+    def render(self, frame, detection: dict, level: LevelTable | None) -> None:
+        renderers = self._renderers
+        if renderers is None:
+            raise RenderUnavailableError("3D overlay rendering is not enabled")
+        renderer = renderers.get()
+        try:
+            renderer.render(frame, detection, level)
+        finally:
+            renderers.put(renderer)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            renderers, self._renderers = self._renderers, None
+        while renderers is not None and not renderers.empty():
+            renderers.get().release()
+
+
+render_pool = RenderPool()
@@ -0,0 +1,242 @@
+"""
+Session-scoped game state for the Chemistry AR API.
+
+Each client gets its own state (currently the selected level), so several
+classrooms can share one deployment. The backend is chosen per deployment:
+
+- memory: in-process dict with TTL and LRU eviction (single worker, or
+  several workers behind a load balancer with session affinity)
+- sqlite: file shared by every worker on the same machine
+- redis: any Redis-compatible server, shared across machines
+"""
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Deployment configuration
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "memory")
+SESSION_TTL = float(os.environ.get("SESSION_TTL", 8 * 60 * 60))
+SESSION_MAX = int(os.environ.get("SESSION_MAX", 10000))
+SESSION_DB = os.environ.get("SESSION_DB", "sessions.db")
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+
+SESSION_COOKIE = "chemistry_ar_session"
+SESSION_HEADER = "X-Session-ID"
+MAX_SESSION_ID_LENGTH = 64
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(16)
+
+
+class SessionStore(ABC):
+    """Interface of the session backends. State is a JSON-serializable dict"""
+
+    @abstractmethod
+    def get(self, session_id: str) -> dict | None:
+        ...
+
+    @abstractmethod
+    def set(self, session_id: str, state: dict) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+
+    def after_fork(self) -> None:
+        """Reopen connections inherited from a pre-fork master process"""
+
+
+class MemorySessionStore(SessionStore):
+    """In-process store with a sliding TTL and least-recently-used eviction"""
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = SESSION_MAX):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            expires, state = entry
+            if expires < now:
+                del self._sessions[session_id]
+                return None
+            self._sessions[session_id] = (now + self.ttl, state)
+            self._sessions.move_to_end(session_id)
+            return dict(state)
+
+    def set(self, session_id, state):
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[session_id] = (now + self.ttl, dict(state))
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite-backed store that every worker process on the host can share"""
+
+    def __init__(self, path: str = SESSION_DB, ttl: float = SESSION_TTL, max_sessions: int = SESSION_MAX):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, state TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+        return db
+
+    def after_fork(self):
+        # A SQLite connection must not be used across fork()
+        self._lock = threading.Lock()
+        self._db = self._connect()
+
+    def get(self, session_id):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT state FROM sessions WHERE id = ? AND expires >= ?", (session_id, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE sessions SET expires = ? WHERE id = ?", (now + self.ttl, session_id)
+            )
+        return json.loads(row[0])
+
+    def set(self, session_id, state):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (id, state, expires) VALUES (?, ?, ?)",
+                (session_id, json.dumps(state), now + self.ttl),
+            )
+            # Expiry time orders sessions by last access, so the oldest go first
+            self._db.execute("DELETE FROM sessions WHERE expires < ?", (now,))
+            self._db.execute(
+                "DELETE FROM sessions WHERE id IN (SELECT id FROM sessions "
+                "ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+
+    def delete(self, session_id):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Store for any Redis-compatible server. Redis expires keys on its own;
+    configure `maxmemory-policy allkeys-lru` on the server for LRU eviction.
+    """
+
+    KEY_PREFIX = "chemistry_ar:session:"
+
+    def __init__(self, url: str = REDIS_URL, ttl: float = SESSION_TTL):
+        if redis is None:
+            raise RuntimeError("The redis session backend requires the 'redis' package")
+        self.ttl = int(ttl)
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, session_id):
+        value = self._client.getex(self.KEY_PREFIX + session_id, ex=self.ttl)
+        return json.loads(value) if value is not None else None
+
+    def set(self, session_id, state):
+        self._client.set(self.KEY_PREFIX + session_id, json.dumps(state), ex=self.ttl)
+
+    def delete(self, session_id):
+        self._client.delete(self.KEY_PREFIX + session_id)
+
+    def after_fork(self):
+        # Pooled sockets of the master must not be shared between workers
+        self._client = redis.Redis.from_url(self.url)
+
+
+def create_session_store(backend: str = SESSION_BACKEND) -> SessionStore:
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "redis":
+        return RedisSessionStore()
+    raise ValueError(f"Unknown session backend: {backend}")
+
+
+class Session:
+    """Game state of one client, loaded from and saved to a SessionStore"""
+
+    DEFAULT_STATE = {"level": 0}
+
+    def __init__(self, store: SessionStore, session_id: str | None):
+        if session_id is not None and len(session_id) > MAX_SESSION_ID_LENGTH:
+            session_id = None
+        self.store = store
+        state = None if session_id is None else store.get(session_id)
+        # Only ids issued here and still in the store are honoured: unknown or
+        # expired ids get a fresh session, so clients cannot pick their own
+        self.is_new = state is None
+        if self.is_new:
+            self.id = new_session_id()
+            self.state = dict(self.DEFAULT_STATE)
+            store.set(self.id, self.state)
+        else:
+            self.id = session_id
+            self.state = state
+
+    @property
+    def level(self) -> int:
+        return self.state.get("level", 0)
+
+    @level.setter
+    def level(self, level: int) -> None:
+        self.state["level"] = level
+        self.store.set(self.id, self.state)
+
+    def attach(self, response):
+        """Tell the client its session id through the response headers"""
+        if self.is_new:
+            response.set_cookie(SESSION_COOKIE, self.id, httponly=True, samesite="lax")
+        response.headers[SESSION_HEADER] = self.id
+        return response
+
+    def refresh(self) -> None:
+        """Reload the state, picking up changes made by other requests"""
+        state = self.store.get(self.id)
+        if state is not None:
+            self.state = state
+
+
+session_store = create_session_store()
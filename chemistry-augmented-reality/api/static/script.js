@@ -14,11 +14,23 @@ const downloadBtn = document.getElementById('downloadBtn');
 const levelSelect = document.getElementById('levelSelect');
 const prevLevelBtn = document.getElementById('prevLevel');
 const nextLevelBtn = document.getElementById('nextLevel');
+const webcamBtn = document.getElementById('webcamBtn');
+const webcamVideo = document.getElementById('webcamVideo');
+
+// Webcam streaming settings
+const WEBCAM_FPS = 15;
+const WEBCAM_JPEG_QUALITY = 0.8;
 
 // File storage
 let selectedFile = null;
 let processedImageBlob = null;
 
+// Webcam state
+let webcamStream = null;
+let webcamSocket = null;
+let webcamTimer = null;
+const webcamCanvas = document.createElement('canvas');
+
 // Initialize app
 async function init() {
     await checkAPIHealth();
@@ -87,6 +99,9 @@ function setupEventListeners() {
     // Download button
     downloadBtn.addEventListener('click', downloadResult);
 
+    // Webcam button
+    webcamBtn.addEventListener('click', toggleWebcam);
+
     // Level controls
     levelSelect.addEventListener('change', handleLevelChange);
     prevLevelBtn.addEventListener('click', () => changeLevel(-1));
@@ -178,6 +193,93 @@ async function processImage() {
     }
 }
 
+// Show a processed frame in the result card
+function showResult(blob) {
+    const previousUrl = resultImage.src;
+    processedImageBlob = blob;
+    resultImage.src = URL.createObjectURL(blob);
+    resultCard.style.display = 'block';
+    if (previousUrl.startsWith('blob:')) {
+        URL.revokeObjectURL(previousUrl);
+    }
+}
+
+// Start or stop the webcam stream
+async function toggleWebcam() {
+    if (webcamSocket) {
+        stopWebcam();
+    } else {
+        await startWebcam();
+    }
+}
+
+// Stream webcam frames over a single WebSocket
+async function startWebcam() {
+    try {
+        webcamStream = await navigator.mediaDevices.getUserMedia({ video: true });
+    } catch (error) {
+        console.error('Could not open webcam:', error);
+        alert('Could not open webcam');
+        return;
+    }
+    webcamVideo.srcObject = webcamStream;
+
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const baseUrl = API_URL || `${protocol}//${window.location.host}`;
+    webcamSocket = new WebSocket(`${baseUrl.replace(/^http/, 'ws')}/ws/frames`);
+    webcamSocket.binaryType = 'blob';
+
+    webcamSocket.addEventListener('open', () => {
+        updateAPIStatus('webcamStatus', true);
+        webcamTimer = setInterval(sendWebcamFrame, 1000 / WEBCAM_FPS);
+    });
+    webcamSocket.addEventListener('message', (event) => {
+        if (event.data instanceof Blob) {
+            showResult(event.data);
+        } else {
+            console.error('Frame error:', event.data);
+        }
+    });
+    webcamSocket.addEventListener('close', stopWebcam);
+    webcamSocket.addEventListener('error', () => updateAPIStatus('webcamStatus', false));
+
+    webcamBtn.innerHTML = '<span>Stop Webcam</span>';
+}
+
+// Capture the current webcam frame and send it
+function sendWebcamFrame() {
+    // Skip while the previous frame is still being sent
+    if (!webcamSocket || webcamSocket.readyState !== WebSocket.OPEN || webcamSocket.bufferedAmount > 0) {
+        return;
+    }
+    if (!webcamVideo.videoWidth) return;
+
+    webcamCanvas.width = webcamVideo.videoWidth;
+    webcamCanvas.height = webcamVideo.videoHeight;
+    webcamCanvas.getContext('2d').drawImage(webcamVideo, 0, 0);
+    webcamCanvas.toBlob((blob) => {
+        if (blob && webcamSocket && webcamSocket.readyState === WebSocket.OPEN) {
+            webcamSocket.send(blob);
+        }
+    }, 'image/jpeg', WEBCAM_JPEG_QUALITY);
+}
+
+// Stop streaming and release the webcam
+function stopWebcam() {
+    clearInterval(webcamTimer);
+    webcamTimer = null;
+    if (webcamSocket) {
+        const socket = webcamSocket;
+        webcamSocket = null;
+        socket.close();
+    }
+    if (webcamStream) {
+        webcamStream.getTracks().forEach((track) => track.stop());
+        webcamStream = null;
+    }
+    webcamBtn.innerHTML = '<span>Start Webcam</span>';
+}
+
 // Download result
 function downloadResult() {
     if (!processedImageBlob) return;
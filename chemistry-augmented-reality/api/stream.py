@@ -0,0 +1,250 @@
+"""
+MJPEG live streams from server-side video sources (kiosk/projector setups).
+
+Every source runs three threads connected by single-slot handoffs, so
+capture, processing and encoding overlap and a slow stage drops stale
+frames instead of building a backlog:
+
+    capture -> detect + annotate -> encode -> viewers
+
+All viewers of a source share one set of threads; they start with the
+first viewer and stop when the last one disconnects.
+
+A source that cannot be opened, or fails STREAM_MAX_READ_FAILURES reads
+in a row (with a growing pause between them), is dead: new viewers get
+503 and the streams of current viewers end.
+"""
+import asyncio
+import os
+import threading
+import time
+
+import cv2
+
+from api.levels import level_registry
+from api.pipeline import FrameOptions, resize_frame, detect_markers, annotate_frame, encode_frame
+
+# Deployment configuration, e.g. STREAM_SOURCES="projector=0,demo=/srv/videos/demo.mp4"
+STREAM_SOURCES = os.environ.get("STREAM_SOURCES", "")
+STREAM_FPS = float(os.environ.get("STREAM_FPS", 15))
+STREAM_QUALITY = int(os.environ.get("STREAM_QUALITY", 80))
+STREAM_MAX_READ_FAILURES = int(os.environ.get("STREAM_MAX_READ_FAILURES", 10))
+# Seconds to wait for a source to open before answering a new viewer
+STREAM_OPEN_TIMEOUT = 10.0
+# Pause after a failed read, doubled per consecutive failure up to the maximum
+READ_RETRY_DELAY = 0.1
+MAX_READ_RETRY_DELAY = 2.0
+
+BOUNDARY = "frame"
+
+
+class StreamUnavailableError(RuntimeError):
+    """The video source cannot be opened or read"""
+
+
+def parse_sources(config: str) -> dict[str, str | int]:
+    """Parse "name=source,..." where a numeric source is a capture device index"""
+    sources = {}
+    for entry in filter(None, (part.strip() for part in config.split(","))):
+        name, _, source = entry.partition("=")
+        if not source:
+            raise ValueError(f"Invalid stream source: {entry}")
+        sources[name.strip()] = int(source) if source.strip().isdigit() else source.strip()
+    return sources
+
+
+class LatestValue:
+    """Thread-safe single-slot handoff that keeps only the newest value"""
+
+    def __init__(self):
+        self._value = None
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    def put(self, value) -> None:
+        with self._cond:
+            self._value = value
+            self._seq += 1
+            self._cond.notify_all()
+
+    def get_newer(self, seq: int, timeout: float = 1.0):
+        """Wait for a value newer than seq. Returns (seq, value), or (seq, None) on timeout"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > seq, timeout):
+                return seq, None
+            return self._seq, self._value
+
+    def latest(self):
+        return self._seq, self._value
+
+
+class VideoSource:
+    """Capture, processing and encoding threads of one server-side source"""
+
+    def __init__(self, name: str, source: str | int, fps: float = STREAM_FPS,
+                 options: FrameOptions = FrameOptions(resize="fit", quality=STREAM_QUALITY)):
+        self.name = name
+        self.source = source
+        self.fps = fps
+        self.options = options
+        self.level = 0
+        self.viewers = 0
+        self.captured = LatestValue()
+        self.annotated = LatestValue()
+        self.encoded = LatestValue()
+        self._running = threading.Event()
+        self._threads: list[threading.Thread] = []
+        # Set once the capture is open, or has failed
+        self.opened = threading.Event()
+        self.error: str | None = None
+
+    def start(self) -> None:
+        self._running.set()
+        self._threads = [
+            threading.Thread(target=target, name=f"stream-{self.name}-{target.__name__}", daemon=True)
+            for target in (self._capture_loop, self._process_loop, self._encode_loop)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        self._running.clear()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+
+    def _fail(self, error: str) -> None:
+        self.error = error
+        self.opened.set()
+
+    def _capture_loop(self) -> None:
+        capture = cv2.VideoCapture(self.source)
+        try:
+            if not capture.isOpened():
+                self._fail(f"Cannot open video source {self.name!r}")
+                return
+            self.opened.set()
+            # Files are read at their own frame rate; devices block on read()
+            file_fps = capture.get(cv2.CAP_PROP_FPS) if isinstance(self.source, str) else 0
+            delay = 1.0 / file_fps if file_fps > 0 else 0.0
+            failures = 0
+            while self._running.is_set():
+                start = time.perf_counter()
+                ret, frame = capture.read()
+                if not ret:
+                    failures += 1
+                    if failures >= STREAM_MAX_READ_FAILURES:
+                        self._fail(f"Video source {self.name!r} stopped delivering frames")
+                        return
+                    # The first failure of a file is its end; later ones mean
+                    # it cannot be read even from the start
+                    if not (isinstance(self.source, str) and failures == 1):
+                        time.sleep(min(MAX_READ_RETRY_DELAY, READ_RETRY_DELAY * 2 ** (failures - 1)))
+                    if isinstance(self.source, str):
+                        # Loop video files
+                        capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                failures = 0
+                self.captured.put(frame)
+                if delay:
+                    time.sleep(max(0.0, delay - (time.perf_counter() - start)))
+        finally:
+            capture.release()
+
+    def _process_loop(self) -> None:
+        seq = 0
+        interval = 1.0 / self.fps
+        while self._running.is_set():
+            start = time.perf_counter()
+            seq, frame = self.captured.get_newer(seq)
+            if frame is None:
+                continue
+            # Capture allocates a new array per frame, so drawing on it is safe
+            frame = resize_frame(frame, self.options)
+            detection = detect_markers(frame, level_registry.get(self.level))
+            self.annotated.put(annotate_frame(frame, detection))
+            # Hold the target frame rate
+            time.sleep(max(0.0, interval - (time.perf_counter() - start)))
+
+    def _encode_loop(self) -> None:
+        seq = 0
+        while self._running.is_set():
+            seq, frame = self.annotated.get_newer(seq)
+            if frame is not None:
+                self.encoded.put(encode_frame(frame, self.options))
+
+    async def frames(self):
+        """Yield each newly encoded JPEG frame as a multipart part"""
+        seq = 0
+        while True:
+            # Poll instead of blocking a thread per viewer
+            await asyncio.sleep(0.5 / self.fps)
+            if self.error is not None:
+                # Ends the response; its status was sent with the first frame
+                return
+            latest_seq, encoded_img = self.encoded.latest()
+            if latest_seq == seq:
+                continue
+            seq = latest_seq
+            yield (
+                f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                f"Content-Length: {len(encoded_img)}\r\n\r\n"
+            ).encode() + encoded_img + b"\r\n"
+
+
+class StreamHub:
+    """Shares one VideoSource per configured source between its viewers"""
+
+    def __init__(self, sources: dict[str, str | int]):
+        self.sources = sources
+        self._active: dict[str, VideoSource] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, name: str, level: int) -> VideoSource:
+        with self._lock:
+            if name not in self.sources:
+                raise KeyError(name)
+            source = self._active.get(name)
+            if source is None:
+                source = self._active[name] = VideoSource(name, self.sources[name])
+                source.start()
+            source.viewers += 1
+            # The most recent viewer picks the level shown on the shared stream
+            source.level = level
+            return source
+
+    def release(self, source: VideoSource) -> None:
+        with self._lock:
+            source.viewers -= 1
+            if source.viewers > 0:
+                return
+            self._active.pop(source.name, None)
+        source.stop()
+
+    def stop_all(self) -> None:
+        with self._lock:
+            active, self._active = list(self._active.values()), {}
+        for source in active:
+            source.stop()
+
+    async def open(self, name: str, level: int) -> VideoSource:
+        """Acquire a source for a new viewer once it is open. Raises StreamUnavailableError"""
+        source = self.acquire(name, level)
+        await asyncio.to_thread(source.opened.wait, STREAM_OPEN_TIMEOUT)
+        if source.error is not None or not source.opened.is_set():
+            error = source.error or f"Video source {name!r} did not open in time"
+            await asyncio.to_thread(self.release, source)
+            raise StreamUnavailableError(error)
+        return source
+
+    async def stream(self, source: VideoSource):
+        """Multipart MJPEG body for one viewer of a source from open()"""
+        try:
+            async for part in source.frames():
+                yield part
+        finally:
+            # Stopping joins the source threads
+            await asyncio.to_thread(self.release, source)
+
+
+stream_hub = StreamHub(parse_sources(STREAM_SOURCES))
@@ -1,13 +1,22 @@
 """
 Simple test script for the Chemistry AR API
 """
-import requests
+import json
+import os
 import sys
+import tempfile
+
+import cv2
+import requests
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.client import connect
+
+SAMPLE_IMAGE = os.path.join(os.path.dirname(__file__), "..", "sample_markers", "test_level0_water_solution.png")
 
 def test_health_check():
     """Test the health check endpoint"""
     try:
-        response = requests.get("http://localhost:8000/")
+        response = requests.get("http://localhost:8000/health")
         print(f"[OK] Health check: {response.json()}")
         return True
     except Exception as e:
@@ -34,6 +43,103 @@ def test_set_level():
         print(f"[FAIL] Set level failed: {e}")
         return False
 
+def test_process_frame_json():
+    """Test frame processing with JSON detection results"""
+    try:
+        with open(SAMPLE_IMAGE, "rb") as f:
+            response = requests.post("http://localhost:8000/process_frame?output=json", files={"file": f})
+        response.raise_for_status()
+        print(f"[OK] Process frame (json): {response.json()}")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Process frame (json) failed: {e}")
+        return False
+
+def test_process_batch():
+    """Test batch processing of two images"""
+    try:
+        with open(SAMPLE_IMAGE, "rb") as f:
+            contents = f.read()
+        files = [("files", ("a.png", contents)), ("files", ("b.png", contents))]
+        response = requests.post("http://localhost:8000/process_batch?level=0", files=files)
+        response.raise_for_status()
+        results = [json.loads(line) for line in response.text.splitlines()]
+        print(f"[OK] Process batch: {len(results)} results")
+        return len(results) == 2
+    except Exception as e:
+        print(f"[FAIL] Process batch failed: {e}")
+        return False
+
+def test_metrics():
+    """Test the Prometheus metrics endpoint"""
+    try:
+        response = requests.get("http://localhost:8000/metrics")
+        response.raise_for_status()
+        print(f"[OK] Metrics: {response.text.count('# TYPE')} metrics")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Metrics failed: {e}")
+        return False
+
+def test_process_video():
+    """Test video processing on a short clip of the sample image"""
+    try:
+        image = cv2.imread(SAMPLE_IMAGE)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "clip.avi")
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (image.shape[1], image.shape[0]))
+            for _ in range(5):
+                writer.write(image)
+            writer.release()
+            with open(path, "rb") as f:
+                response = requests.post("http://localhost:8000/process_video?level=0", files={"file": f})
+        response.raise_for_status()
+        print(f"[OK] Process video: {response.json()['frames']} frames")
+        return True
+    except Exception as e:
+        print(f"[FAIL] Process video failed: {e}")
+        return False
+
+def test_ready():
+    """Test the readiness endpoint"""
+    try:
+        response = requests.get("http://localhost:8000/ready")
+        print(f"[OK] Ready: {response.status_code} {response.json()}")
+        return response.status_code == 200
+    except Exception as e:
+        print(f"[FAIL] Ready failed: {e}")
+        return False
+
+def test_frames_socket():
+    """Test the frame WebSocket with JSON detection results"""
+    try:
+        with open(SAMPLE_IMAGE, "rb") as f:
+            contents = f.read()
+        with connect("ws://localhost:8000/ws/frames?output=json") as websocket:
+            websocket.send(contents)
+            detection = json.loads(websocket.recv(timeout=30))
+        print(f"[OK] Frames socket: {detection}")
+        return "error" not in detection
+    except Exception as e:
+        print(f"[FAIL] Frames socket failed: {e}")
+        return False
+
+def test_frames_socket_text():
+    """Test that the frame WebSocket closes on a text message"""
+    try:
+        with connect("ws://localhost:8000/ws/frames?output=json") as websocket:
+            websocket.send("not a frame")
+            try:
+                websocket.recv(timeout=10)
+            except ConnectionClosed as e:
+                print(f"[OK] Frames socket closed on text: {e.rcvd.code}")
+                return e.rcvd is not None and e.rcvd.code == 1003
+        print("[FAIL] Frames socket stayed open after a text message")
+        return False
+    except Exception as e:
+        print(f"[FAIL] Frames socket (text) failed: {e}")
+        return False
+
 if __name__ == "__main__":
     print("Testing Chemistry AR API...")
     print("-" * 50)
@@ -42,6 +148,13 @@ if __name__ == "__main__":
     results.append(test_health_check())
     results.append(test_get_levels())
     results.append(test_set_level())
+    results.append(test_process_frame_json())
+    results.append(test_process_batch())
+    results.append(test_metrics())
+    results.append(test_process_video())
+    results.append(test_ready())
+    results.append(test_frames_socket())
+    results.append(test_frames_socket_text())
     
     print("-" * 50)
     if all(results):
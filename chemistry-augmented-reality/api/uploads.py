@@ -0,0 +1,271 @@
+"""
+Bounded, pooled ingestion of frame uploads.
+
+Starlette's form parser copies every file chunk into a spooled temporary
+file (on disk beyond 1 MB), which the endpoint then reads back into a new
+bytes object. Frames are instead streamed from the request straight into a
+preallocated buffer checked out of a pool, and decoded from that memory:
+
+- raw bodies (e.g. Content-Type: image/jpeg) are copied once, chunk by chunk
+- multipart bodies are parsed incrementally and only the "file" part is kept
+
+Bodies larger than MAX_UPLOAD_BYTES are rejected from their Content-Length
+before anything is read, or as soon as the streamed size exceeds it. The
+files of a batch are streamed the same way by stream_files.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+import numpy as np
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+# Deployment configuration
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 20 * 1024 * 1024))
+UPLOAD_POOL_SIZE = int(os.environ.get("UPLOAD_POOL_SIZE", 8))
+
+UPLOAD_FIELD = b"file"
+# Room for the boundaries and part headers around the file in a multipart body
+MULTIPART_OVERHEAD = 16 * 1024
+
+# OpenAPI description of the body accepted by read_upload
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            },
+            "image/*": {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+
+class UploadTooLargeError(ValueError):
+    """The upload exceeds MAX_UPLOAD_BYTES"""
+
+
+class InvalidUploadError(ValueError):
+    """The body is not a usable frame upload"""
+
+
+class BufferPool:
+    """
+    Reusable upload buffers of `capacity` bytes. np.empty only reserves the
+    memory, so pages are committed as uploads fill them and stay committed
+    for the next upload. A buffer belongs to one upload from acquire() until
+    its release().
+    """
+
+    def __init__(self, capacity: int = MAX_UPLOAD_BYTES, size: int = UPLOAD_POOL_SIZE):
+        self.capacity = capacity
+        self.size = size
+        self._free: list[np.ndarray] = []
+
+    def acquire(self) -> np.ndarray:
+        return self._free.pop() if self._free else np.empty(self.capacity, np.uint8)
+
+    def release(self, buffer: np.ndarray) -> None:
+        # Buffers beyond the pool size are left to the garbage collector
+        if len(self._free) < self.size:
+            self._free.append(buffer)
+
+    @property
+    def free(self) -> int:
+        return len(self._free)
+
+
+class _BufferWriter:
+    """Appends chunks to a buffer, enforcing the size limit"""
+
+    def __init__(self, buffer: np.ndarray, max_bytes: int):
+        self.buffer = buffer
+        self.max_bytes = max_bytes
+        self.size = 0
+
+    def write(self, data, start: int = 0, end: int | None = None) -> None:
+        end = len(data) if end is None else end
+        new_size = self.size + end - start
+        if new_size > self.max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds {self.max_bytes} bytes")
+        self.buffer[self.size:new_size] = np.frombuffer(data, np.uint8, end - start, start)
+        self.size = new_size
+
+
+class _FilePartCollector:
+    """Multipart callbacks that write the data of the first "file" part to a writer"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.found = False
+        self.filename: str | None = None
+        self._in_file = False
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def on_part_begin(self):
+        self._disposition = b""
+
+    def on_header_field(self, data, start, end):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        self._in_file = not self.found and options.get(b"name") == UPLOAD_FIELD
+        if self._in_file and b"filename" in options:
+            self.filename = options[b"filename"].decode("utf-8", "replace")
+        self.found = self.found or self._in_file
+
+    def on_part_data(self, data, start, end):
+        if self._in_file:
+            self.writer.write(data, start, end)
+
+    def on_part_end(self):
+        self._in_file = False
+
+    def callbacks(self) -> dict:
+        return {
+            name: getattr(self, name)
+            for name in ("on_part_begin", "on_header_field", "on_header_value", "on_header_end",
+                         "on_headers_finished", "on_part_data", "on_part_end")
+        }
+
+
+class _FilePartsCollector(_FilePartCollector):
+    """
+    Multipart callbacks that write every part of one field to a writer,
+    announcing each with writer.begin(filename, content_type)
+    """
+
+    def __init__(self, writer, field: bytes):
+        super().__init__(writer)
+        self.field = field
+        self._content_type: str | None = None
+
+    def on_part_begin(self):
+        super().on_part_begin()
+        self._content_type = None
+
+    def on_header_end(self):
+        if self._header_name.lower() == b"content-type":
+            self._content_type = self._header_value.decode("latin-1")
+        super().on_header_end()
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        self._in_file = options.get(b"name") == self.field
+        if self._in_file:
+            self.found = True
+            filename = options.get(b"filename")
+            self.writer.begin(filename.decode("utf-8", "replace") if filename else None, self._content_type)
+
+
+def check_content_length(request, max_bytes: int, error: type[Exception] = UploadTooLargeError) -> None:
+    """Reject a body whose Content-Length already exceeds the limit, before reading it"""
+    is_multipart = request.headers.get("content-type", "").startswith("multipart/form-data")
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit():
+        if int(length) > max_bytes + (MULTIPART_OVERHEAD if is_multipart else 0):
+            raise error(f"Upload exceeds {max_bytes} bytes")
+
+
+async def stream_upload(request, writer, after_chunk=None) -> str | None:
+    """
+    Feed the uploaded file to writer.write(data, start, end) as the body
+    arrives: the "file" field of a multipart body, or the raw body. The
+    writer enforces the size limit by raising. `after_chunk`, when given,
+    is awaited after every received chunk.
+
+    Returns:
+        The multipart filename, if any
+    """
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith("multipart/form-data"):
+        async for chunk in request.stream():
+            writer.write(chunk)
+            if after_chunk is not None:
+                await after_chunk()
+        return None
+
+    collector = _FilePartCollector(writer)
+    await _parse_multipart(request, collector, after_chunk)
+    if not collector.found:
+        raise InvalidUploadError("Missing 'file' field in multipart body")
+    return collector.filename
+
+
+async def stream_files(request, field: bytes, writer) -> None:
+    """
+    Feed every file of a multipart field to the writer as the body arrives:
+    writer.begin(filename, content_type) starts a file and
+    writer.write(data, start, end) appends to it. The writer enforces the
+    limits by raising.
+    """
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise InvalidUploadError("Expected a multipart/form-data body")
+    collector = _FilePartsCollector(writer, field)
+    await _parse_multipart(request, collector)
+    if not collector.found:
+        raise InvalidUploadError(f"Missing '{field.decode()}' field in multipart body")
+
+
+async def _parse_multipart(request, collector: _FilePartCollector, after_chunk=None) -> None:
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    if b"boundary" not in params:
+        raise InvalidUploadError("Missing boundary in multipart body")
+    parser = MultipartParser(params[b"boundary"], collector.callbacks())
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if after_chunk is not None:
+                await after_chunk()
+        parser.finalize()
+    except MultipartParseError as e:
+        raise InvalidUploadError(f"Invalid multipart body: {e}")
+
+
+@asynccontextmanager
+async def read_upload(request, pool: BufferPool = None, max_bytes: int = MAX_UPLOAD_BYTES):
+    """
+    Stream the uploaded frame into a pooled buffer.
+
+    Yields:
+        Memoryview of the frame bytes, valid until the block exits
+    """
+    pool = pool or upload_pool
+    check_content_length(request, max_bytes)
+
+    buffer = pool.acquire()
+    try:
+        writer = _BufferWriter(buffer, min(max_bytes, pool.capacity))
+        await stream_upload(request, writer)
+        if writer.size == 0:
+            raise InvalidUploadError("Empty upload")
+        yield memoryview(buffer)[:writer.size]
+    except asyncio.CancelledError:
+        # A cancelled block may leave a worker thread still reading the
+        # buffer, so it goes to the garbage collector (once that thread
+        # drops it) instead of to the next upload
+        buffer = None
+        raise
+    finally:
+        if buffer is not None:
+            pool.release(buffer)
+
+
+upload_pool = BufferPool()
@@ -0,0 +1,322 @@
+"""
+Marker timelines and annotated videos of uploaded clips.
+
+The upload is streamed from the request to a temporary file (OpenCV only
+reads videos from paths), and rejected from its Content-Length or as soon
+as it grows past MAX_VIDEO_BYTES. It is then decoded as a stream by threads connected through
+bounded queues, so only a few frames are in memory at any time:
+
+    decode -> detect / track + annotate -> encode (annotated video only)
+
+Markers are fully detected every VIDEO_DETECT_INTERVAL frames. In between,
+their corners are followed with pyramidal Lucas-Kanade optical flow, which
+costs a fraction of a detection; losing any marker forces a new detection.
+"""
+import asyncio
+import os
+import queue
+import tempfile
+import threading
+from contextlib import asynccontextmanager
+
+import cv2
+import numpy as np
+
+from api.detectors import detector_pool
+from api.levels import LevelTable
+from api.pipeline import FrameOptions, resize_frame, label_markers, annotate_frame
+from api.uploads import check_content_length, stream_upload
+
+# Deployment configuration
+MAX_VIDEO_BYTES = int(os.environ.get("MAX_VIDEO_BYTES", 100 * 1024 * 1024))
+MAX_VIDEO_FRAMES = int(os.environ.get("MAX_VIDEO_FRAMES", 1800))
+VIDEO_DETECT_INTERVAL = int(os.environ.get("VIDEO_DETECT_INTERVAL", 5))
+VIDEO_JOBS = int(os.environ.get("VIDEO_JOBS", 1))
+
+QUEUE_SIZE = 8
+DEFAULT_FPS = 30.0
+
+# Output container -> (fourcc, media type)
+VIDEO_FORMATS = {
+    "webm": ("VP80", "video/webm"),
+    "mp4": ("mp4v", "video/mp4"),
+}
+
+
+# OpenAPI description of the body accepted by spool_upload
+VIDEO_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            },
+            "video/*": {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+
+class VideoTooLargeError(ValueError):
+    """The uploaded video exceeds MAX_VIDEO_BYTES"""
+
+
+class InvalidVideoError(ValueError):
+    """The uploaded bytes could not be decoded as a video"""
+
+
+class VideoBusyError(RuntimeError):
+    """Every video processing slot is taken"""
+
+
+_slots = threading.BoundedSemaphore(max(1, VIDEO_JOBS))
+
+
+@asynccontextmanager
+async def video_slot():
+    """Reserve one of the VIDEO_JOBS processing slots, or raise VideoBusyError"""
+    if not _slots.acquire(blocking=False):
+        raise VideoBusyError("Too many videos being processed, try again later")
+    try:
+        yield
+    finally:
+        _slots.release()
+
+
+class _SpoolWriter:
+    """Collects upload chunks for the temporary file, enforcing the size limit"""
+
+    def __init__(self, out, max_bytes: int):
+        self.out = out
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._pending = bytearray()
+
+    def write(self, data, start: int = 0, end: int | None = None) -> None:
+        end = len(data) if end is None else end
+        self.size += end - start
+        if self.size > self.max_bytes:
+            raise VideoTooLargeError(f"Video exceeds {self.max_bytes} bytes")
+        self._pending += memoryview(data)[start:end]
+
+    async def flush(self) -> None:
+        if self._pending:
+            pending, self._pending = self._pending, bytearray()
+            await asyncio.to_thread(self.out.write, pending)
+
+
+async def spool_upload(request, max_bytes: int = MAX_VIDEO_BYTES) -> str:
+    """
+    Stream the uploaded video (multipart "file" field or raw body) to a
+    temporary file. Returns its path
+    """
+    check_content_length(request, max_bytes, VideoTooLargeError)
+    fd, path = tempfile.mkstemp(prefix="chemistry_ar_video_")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            writer = _SpoolWriter(out, max_bytes)
+            filename = await stream_upload(request, writer, writer.flush)
+            await writer.flush()
+        if writer.size == 0:
+            raise InvalidVideoError("Empty upload")
+        # OpenCV picks the demuxer partly from the extension
+        suffix = os.path.splitext(filename or "")[1].lower()
+        if suffix[1:].isalnum():
+            os.rename(path, path + suffix)
+            path += suffix
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+class MarkerTracker:
+    """Follows detected marker corners between full detections with optical flow"""
+
+    LK_PARAMS = dict(
+        winSize=(21, 21),
+        maxLevel=3,
+        criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 0.01),
+    )
+
+    def __init__(self, detect_interval: int = VIDEO_DETECT_INTERVAL):
+        self.detect_interval = max(1, detect_interval)
+        self.detections = 0
+        self._gray = None
+        self._corners = ()
+        self._ids = None
+        self._since_detection = 0
+
+    def update(self, frame) -> tuple[tuple, np.ndarray | None, bool]:
+        """Markers of the next frame. Returns (corners, ids, tracked)"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        tracked = None
+        if self._gray is not None and self._since_detection < self.detect_interval:
+            tracked = self._track(gray)
+
+        if tracked is None:
+            corners, ids, _ = detector_pool.detect(frame)
+            self.detections += 1
+            self._since_detection = 1
+        else:
+            corners, ids = tracked
+            self._since_detection += 1
+
+        self._gray, self._corners, self._ids = gray, corners, ids
+        return corners, ids, tracked is not None
+
+    def _track(self, gray):
+        """Move the last corners along the optical flow, or None when a marker is lost"""
+        if self._ids is None:
+            return (), None
+        points = np.concatenate(self._corners).reshape(-1, 1, 2)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self._gray, gray, points, None, **self.LK_PARAMS)
+        if moved is None or not status.all():
+            return None
+        return tuple(moved.reshape(-1, 1, 4, 2)), self._ids
+
+
+def _put(frames: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blocking put that gives up once the pipeline is stopped"""
+    while not stop.is_set():
+        try:
+            frames.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(frames: queue.Queue, stop: threading.Event):
+    """Blocking get that returns None once the pipeline is stopped"""
+    while True:
+        try:
+            return frames.get(timeout=0.1)
+        except queue.Empty:
+            if stop.is_set():
+                return None
+
+
+def _decode_loop(capture, options: FrameOptions, decoded: queue.Queue, stop: threading.Event, info: dict):
+    try:
+        for index in range(MAX_VIDEO_FRAMES):
+            ret, frame = capture.read()
+            if not ret:
+                return
+            timestamp = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            if not _put(decoded, (index, timestamp, resize_frame(frame, options)), stop):
+                return
+        info["truncated"] = capture.grab()
+    except Exception as e:
+        info["error"] = f"Error decoding video: {e}"
+    finally:
+        _put(decoded, None, stop)
+
+
+def _encode_loop(output_path: str, video_format: str, fps: float, annotated: queue.Queue,
+                 stop: threading.Event, info: dict):
+    fourcc, _ = VIDEO_FORMATS[video_format]
+    writer = None
+    try:
+        while (frame := _get(annotated, stop)) is not None:
+            if writer is None:
+                height, width = frame.shape[:2]
+                writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+                if not writer.isOpened():
+                    info["error"] = f"Cannot encode {video_format} video"
+                    stop.set()
+                    return
+            writer.write(frame)
+    finally:
+        if writer is not None:
+            writer.release()
+
+
+def analyze_video(path: str, level: LevelTable | None, options: FrameOptions,
+                  output_path: str | None = None, video_format: str = "webm") -> dict:
+    """
+    Detect and track markers on every frame of a video file.
+
+    Args:
+        path: Video file to read
+        level: Compiled table of the level used for the labels
+        options: Detection size of the frames
+        output_path: Also write the annotated video there when given
+        video_format: Container/codec of the annotated video ("webm" or "mp4")
+
+    Returns:
+        Timeline with the markers of every frame and the time at which the
+        objective was first met
+    """
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        capture.release()
+        raise InvalidVideoError("Invalid video file")
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    fps = fps if 0 < fps < 1000 else DEFAULT_FPS
+
+    stop = threading.Event()
+    info = {"truncated": False, "error": None}
+    decoded = queue.Queue(maxsize=QUEUE_SIZE)
+    annotated = queue.Queue(maxsize=QUEUE_SIZE) if output_path else None
+    threads = [threading.Thread(target=_decode_loop, args=(capture, options, decoded, stop, info),
+                                name="video-decode", daemon=True)]
+    if annotated is not None:
+        threads.append(threading.Thread(target=_encode_loop,
+                                        args=(output_path, video_format, fps, annotated, stop, info),
+                                        name="video-encode", daemon=True))
+    for thread in threads:
+        thread.start()
+
+    tracker = MarkerTracker()
+    timeline = []
+    objective_met_at = None
+    width = height = 0
+    try:
+        while (item := _get(decoded, stop)) is not None:
+            index, timestamp, frame = item
+            height, width = frame.shape[:2]
+            corners, ids, tracked = tracker.update(frame)
+            detection = label_markers(corners, ids, level)
+            if detection["objective_met"] and objective_met_at is None:
+                objective_met_at = timestamp
+            timeline.append({
+                "frame": index,
+                "time": timestamp,
+                "tracked": tracked,
+                "markers": [
+                    {key: value for key, value in marker.items() if key != "color"}
+                    for marker in detection["markers"]
+                ],
+                "objective_met": detection["objective_met"],
+            })
+            # Decoding allocates a new array per frame, so drawing on it is safe
+            if annotated is not None and not _put(annotated, annotate_frame(frame, detection), stop):
+                break
+    finally:
+        if annotated is not None:
+            _put(annotated, None, stop)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        capture.release()
+
+    if info["error"]:
+        raise RuntimeError(info["error"])
+    if not timeline:
+        raise InvalidVideoError("Video has no readable frames")
+
+    return {
+        "fps": fps,
+        "width": width,
+        "height": height,
+        "frames": len(timeline),
+        "truncated": info["truncated"],
+        "detections": tracker.detections,
+        "objective_met_at": objective_met_at,
+        "timeline": timeline,
+    }
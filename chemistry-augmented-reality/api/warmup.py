@@ -0,0 +1,85 @@
+"""
+Startup warm-up and readiness.
+
+The first frame of a fresh process pays for OpenCV's lazy initialization:
+the internal thread pool, the codecs and the detector buffers. The levels
+are preloaded, the detectors built and WARMUP_FRAMES dummy frames run
+through the whole pipeline (every output codec, JSON detection and 3D
+overlays when enabled) before the process reports itself ready on /ready.
+
+Under gunicorn the warm-up runs in post_fork, before the worker accepts
+connections; under plain uvicorn it runs in the background right after
+startup, so /health answers at once while /ready waits for the warm-up.
+"""
+import asyncio
+import os
+import time
+
+from api.detectors import detector_pool
+from api.executor import FrameExecutor
+from api.levels import level_registry
+from api.pipeline import warm_up
+
+# Deployment configuration
+WARMUP_FRAMES = int(os.environ.get("WARMUP_FRAMES", 1))
+
+
+class Readiness:
+    """Warm-up state of this process"""
+
+    def __init__(self, frames: int = WARMUP_FRAMES):
+        self.frames = frames
+        self.ready = False
+        self.seconds: float | None = None
+        self.error: str | None = None
+        # Whether warm-up frames ran in this process (gunicorn post_fork)
+        self._warmed_here = False
+
+    def _preload(self):
+        level_registry.reload_if_changed()
+        detector_pool.build()
+        return level_registry.get(0)
+
+    def _finish(self, start: float, error: Exception | None = None) -> None:
+        # A failed warm-up still serves traffic, only cold
+        self.error = f"{type(error).__name__}: {error}" if error is not None else None
+        self.seconds = time.perf_counter() - start
+        self.ready = True
+
+    def run(self) -> None:
+        """Warm up in the calling thread"""
+        start = time.perf_counter()
+        try:
+            warm_up(self._preload(), self.frames)
+            self._warmed_here = True
+        except Exception as e:
+            self._finish(start, e)
+            raise
+        self._finish(start)
+
+    async def run_in(self, executor: FrameExecutor) -> None:
+        """Warm up every worker of the frame executor"""
+        # Thread workers share this process, which gunicorn already warmed up
+        if self._warmed_here and executor.kind == "thread":
+            return
+        start = time.perf_counter()
+        try:
+            level = await asyncio.to_thread(self._preload)
+            # One job per worker, submitted together so they spread over the
+            # threads, or start every process of a process pool
+            await asyncio.gather(*(executor.run(warm_up, level, self.frames) for _ in range(executor.workers)))
+        except Exception as e:
+            self._finish(start, e)
+            return
+        self._finish(start)
+
+    def status(self) -> dict:
+        status = {"status": "ready" if self.ready else "warming_up"}
+        if self.seconds is not None:
+            status["warm_up_seconds"] = round(self.seconds, 3)
+        if self.error is not None:
+            status["warm_up_error"] = self.error
+        return status
+
+
+readiness = Readiness()
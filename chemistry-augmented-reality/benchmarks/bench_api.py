@@ -0,0 +1,421 @@
+"""
+Load test of POST /process_frame.
+
+Posts the sample_markers images and synthetic frames (varying resolution
+and marker count) at a fixed concurrency, then prints requests per second,
+p50/p95/p99 latency per frame kind and the per-stage breakdown reported by
+the server in its Server-Timing header. These cover the 200 responses only;
+other statuses are counted by status, and any of them makes the run exit
+with status 1.
+
+Two transports:
+
+- asgi: calls the FastAPI app in this process (no sockets, no HTTP parsing),
+  which isolates the application and pipeline cost
+- socket: starts uvicorn in a subprocess (or targets --url) and talks
+  HTTP/1.1 over keep-alive connections, like production clients
+
+    python benchmarks/bench_api.py --transport both --concurrency 8 --requests 400
+    python benchmarks/bench_api.py --transport socket --workers 4 --save run.json
+    python benchmarks/bench_api.py --baseline run.json --tolerance 0.1
+
+The result cache is disabled unless --cache is given, so every request
+does the full work. Every concurrent worker gets its own session id from
+the server before the run, as separate clients would, so the per-client
+admission limit
+(ADMISSION_PER_CLIENT) does not reject them; a --concurrency above the
+server's ADMISSION_MAX_IN_FLIGHT shows up as 503 errors in the summary.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+RESOLUTIONS = "640x480,1280x720,1920x1080"
+MARKER_COUNTS = "1,4,12"
+
+
+def load_samples() -> list[tuple[str, bytes]]:
+    samples = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "sample_markers", "*.png"))):
+        with open(path, "rb") as f:
+            samples.append(("sample", f.read()))
+    return samples
+
+
+def make_frame(width: int, height: int, markers: int, seed: int = 0) -> bytes:
+    """JPEG camera-like frame with a grid of DICT_6X6_250 markers on a noisy background"""
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 3), 180, np.uint8)
+    frame = cv2.add(frame, rng.integers(0, 40, frame.shape, dtype=np.uint8))
+    dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_6X6_250)
+
+    columns = int(np.ceil(np.sqrt(markers * width / height)))
+    rows = int(np.ceil(markers / columns))
+    cell = min(width // columns, height // rows)
+    side = int(cell * 0.6)
+    for marker_id in range(markers):
+        row, column = divmod(marker_id, columns)
+        x = column * cell + (cell - side) // 2
+        y = row * cell + (cell - side) // 2
+        marker = cv2.aruco.generateImageMarker(dictionary, marker_id % 250, side)
+        frame[y:y + side, x:x + side] = cv2.cvtColor(marker, cv2.COLOR_GRAY2BGR)
+
+    success, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    assert success
+    return encoded.tobytes()
+
+
+def build_workload(resolutions: str, marker_counts: str) -> list[tuple[str, bytes]]:
+    workload = load_samples()
+    for resolution in filter(None, resolutions.split(",")):
+        width, height = (int(v) for v in resolution.split("x"))
+        for markers in (int(v) for v in filter(None, marker_counts.split(","))):
+            workload.append((f"{width}x{height}/{markers}m", make_frame(width, height, markers)))
+    return workload
+
+
+def multipart_body(contents: bytes, boundary: str) -> bytes:
+    return (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="frame"\r\n'
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + contents + f"\r\n--{boundary}--\r\n".encode()
+
+
+def parse_server_timing(value: str) -> dict[str, float]:
+    """Stage -> seconds from a Server-Timing header"""
+    stages = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        name, _, params = entry.partition(";")
+        for param in params.split(";"):
+            key, _, duration = param.strip().partition("=")
+            if key == "dur":
+                stages[name] = float(duration) / 1000
+    return stages
+
+
+class AsgiClient:
+    """Calls the ASGI app directly, running its lifespan around the test"""
+
+    def __init__(self, app):
+        self.app = app
+        self._lifespan = None
+
+    async def __aenter__(self):
+        self._lifespan = self.app.router.lifespan_context(self.app)
+        await self._lifespan.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._lifespan.__aexit__(*exc_info)
+
+    async def post(self, path: str, body: bytes, content_type: str, session: str | None):
+        target, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": target,
+            "raw_path": target.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [
+                (b"host", b"bench"),
+                (b"content-type", content_type.encode()),
+                (b"content-length", str(len(body)).encode()),
+            ],
+            "client": ("127.0.0.1", 0),
+            "server": ("bench", 80),
+        }
+        if session is not None:
+            # A known session, so no session is minted per request
+            scope["headers"].append((b"x-session-id", session.encode()))
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        status, headers, length = 0, {}, 0
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            # Nothing more to read: wait as a real server would until the response is sent
+            await asyncio.Event().wait()
+
+        async def send(message):
+            nonlocal status, headers, length
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = {k.decode().lower(): v.decode() for k, v in message["headers"]}
+            elif message["type"] == "http.response.body":
+                length += len(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status, headers, length
+
+
+class SocketClient:
+    """Minimal HTTP/1.1 client with one keep-alive connection per concurrent worker"""
+
+    def __init__(self, url: str):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        for _, writer in self._idle:
+            writer.close()
+
+    async def post(self, path: str, body: bytes, content_type: str, session: str | None):
+        if self._idle:
+            reader, writer = self._idle.pop()
+        else:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        writer.write((
+            f"POST {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+            + (f"X-Session-ID: {session}\r\n" if session is not None else "") + "\r\n"
+        ).encode() + body)
+        await writer.drain()
+
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        await reader.readexactly(length)
+
+        if headers.get("connection", "").lower() == "close":
+            writer.close()
+        else:
+            self._idle.append((reader, writer))
+        return status, headers, length
+
+
+async def run_load(client, workload, path: str, concurrency: int, requests: int, warmup: int):
+    """Post the workload round-robin from `concurrency` workers. Returns (seconds, results)"""
+    boundary = uuid.uuid4().hex
+    content_type = f"multipart/form-data; boundary={boundary}"
+    bodies = [(kind, multipart_body(contents, boundary)) for kind, contents in workload]
+
+    # The server only honours the session ids it issued
+    sessions = []
+    for i in range(max(1, concurrency)):
+        _, headers, _ = await client.post(path, bodies[i % len(bodies)][1], content_type, None)
+        sessions.append(headers["x-session-id"])
+    for i in range(warmup):
+        await client.post(path, bodies[i % len(bodies)][1], content_type, sessions[0])
+
+    results = []
+    next_index = 0
+
+    async def worker(session: str):
+        nonlocal next_index
+        while next_index < requests:
+            kind, body = bodies[next_index % len(bodies)]
+            next_index += 1
+            start = time.perf_counter()
+            status, headers, _ = await client.post(path, body, content_type, session)
+            latency = time.perf_counter() - start
+            results.append((kind, status, latency, parse_server_timing(headers.get("server-timing", ""))))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(session) for session in sessions[:concurrency]))
+    return time.perf_counter() - start, results
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+def summarize(elapsed: float, results) -> dict:
+    """
+    Throughput and latencies of the successful (200) responses; rejected
+    and failed requests answer fast and would make a bad run look good,
+    so they are only counted, by status.
+    """
+    ok = [result for result in results if result[1] == 200]
+    errors = {}
+    for _, status, _, _ in results:
+        if status != 200:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+    kinds = {}
+    for kind, _, latency, _ in ok:
+        kinds.setdefault(kind, []).append(latency)
+    stages = {}
+    for _, _, _, timings in ok:
+        for stage, seconds in timings.items():
+            stages.setdefault(stage, []).append(seconds)
+    return {
+        "requests": len(results),
+        "ok": len(ok),
+        "errors": sum(errors.values()),
+        "errors_by_status": errors,
+        "seconds": elapsed,
+        "rps": len(ok) / elapsed,
+        "latency": percentiles([latency for _, _, latency, _ in ok]),
+        "kinds": {kind: percentiles(values) for kind, values in kinds.items()},
+        "stages": {
+            stage: {"mean": float(np.mean(values)), **percentiles(values)}
+            for stage, values in stages.items()
+        },
+    }
+
+
+def print_summary(transport: str, summary: dict) -> None:
+    ms = lambda p: f"{p['p50'] * 1000:>8.1f} {p['p95'] * 1000:>8.1f} {p['p99'] * 1000:>8.1f}"
+    print(f"\n[{transport}] {summary['requests']} requests in {summary['seconds']:.2f}s: "
+          f"{summary['ok']} ok, {summary['rps']:.1f} ok req/s, {summary['errors']} errors")
+    if summary["errors"]:
+        by_status = ", ".join(f"{status}: {count}" for status, count in sorted(summary["errors_by_status"].items()))
+        print(f"WARNING: {summary['errors'] / summary['requests']:.1%} of the requests failed ({by_status}); "
+              f"req/s and latencies cover the 200 responses only")
+    print(f"{'':>20} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    print(f"{'all':>20} {ms(summary['latency'])}")
+    for kind, values in summary["kinds"].items():
+        print(f"{kind:>20} {ms(values)}")
+    if summary["stages"]:
+        print(f"{'stage':>20} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+        for stage, values in summary["stages"].items():
+            print(f"{stage:>20} {ms(values)} {values['mean'] * 1000:>8.1f}")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, workers: int, cache: bool) -> subprocess.Popen:
+    env = dict(os.environ)
+    if not cache:
+        env["RESULT_CACHE_ENTRIES"] = "0"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start listening")
+
+
+async def bench_asgi(workload, path, args) -> dict:
+    from api.cache import result_cache
+    from api.main import app
+
+    if not args.cache:
+        result_cache.max_entries = 0
+    async with AsgiClient(app) as client:
+        elapsed, results = await run_load(client, workload, path, args.concurrency, args.requests, args.warmup)
+    return summarize(elapsed, results)
+
+
+async def bench_socket(workload, path, url, args) -> dict:
+    async with SocketClient(url) as client:
+        elapsed, results = await run_load(client, workload, path, args.concurrency, args.requests, args.warmup)
+    return summarize(elapsed, results)
+
+
+def compare(summaries: dict, baseline: dict, tolerance: float) -> bool:
+    """Print the change against a saved run. Returns False on a regression beyond the tolerance"""
+    ok = True
+    for transport, summary in summaries.items():
+        if transport not in baseline:
+            continue
+        before = baseline[transport]
+        rps_change = summary["rps"] / before["rps"] - 1
+        p95_change = summary["latency"]["p95"] / before["latency"]["p95"] - 1
+        regressed = rps_change < -tolerance or p95_change > tolerance
+        ok = ok and not regressed
+        print(f"[{transport}] req/s {rps_change:+.1%}, p95 {p95_change:+.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", choices=["asgi", "socket", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--output", choices=["image", "json"], default="image")
+    parser.add_argument("--resolutions", default=RESOLUTIONS, help="Synthetic frame sizes, e.g. 640x480,1920x1080")
+    parser.add_argument("--markers", default=MARKER_COUNTS, help="Markers per synthetic frame, e.g. 1,4,12")
+    parser.add_argument("--url", help="Load test a running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of the started server")
+    parser.add_argument("--cache", action="store_true", help="Keep the result cache enabled")
+    parser.add_argument("--save", help="Write the results as JSON")
+    parser.add_argument("--baseline", help="Compare with results saved by --save")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed req/s drop and p95 rise")
+    args = parser.parse_args()
+
+    workload = build_workload(args.resolutions, args.markers)
+    path = f"/process_frame?output={args.output}"
+    print(f"{len(workload)} frames, {args.requests} requests, concurrency {args.concurrency}, output={args.output}")
+
+    summaries = {}
+    if args.transport in ("asgi", "both"):
+        summaries["asgi"] = asyncio.run(bench_asgi(workload, path, args))
+        print_summary("asgi", summaries["asgi"])
+
+    if args.transport in ("socket", "both"):
+        server = None
+        url = args.url
+        if url is None:
+            port = free_port()
+            server = start_server(port, args.workers, args.cache)
+            url = f"http://127.0.0.1:{port}"
+        try:
+            summaries["socket"] = asyncio.run(bench_socket(workload, path, url, args))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+        print_summary("socket", summaries["socket"])
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(summaries, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(summaries, baseline, args.tolerance):
+            sys.exit(1)
+    if any(summary["errors"] for summary in summaries.values()):
+        # A run with failed requests is not a valid measurement
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Full versus reduced-resolution decode of large uploads.
+
+Builds phone-sized photos from the sample_markers composite, then times
+decode + resize to the detection size with IMREAD_COLOR and with the
+reduced decode picked by api.pipeline, and checks that the markers are
+still found:
+
+    python benchmarks/bench_decode.py --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api.detectors import detector_pool
+from api.pipeline import FrameOptions, reduced_decode_flag, resize_frame
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+SIZES = [(4032, 3024), (3000, 4000), (1920, 1080)]
+FLAG_NAMES = {
+    cv2.IMREAD_COLOR: "full",
+    cv2.IMREAD_REDUCED_COLOR_2: "1/2",
+    cv2.IMREAD_REDUCED_COLOR_4: "1/4",
+    cv2.IMREAD_REDUCED_COLOR_8: "1/8",
+}
+
+
+def make_photo(width: int, height: int, ext: str) -> bytes:
+    composite = cv2.imread(os.path.join(ROOT, "sample_markers", "test_level0_water_solution.png"))
+    photo = cv2.resize(composite, (width, height), interpolation=cv2.INTER_LINEAR)
+    # Sensor noise keeps the encoded size realistic
+    noise = np.random.default_rng(0).integers(0, 12, photo.shape, dtype=np.uint8)
+    success, encoded = cv2.imencode(ext, cv2.add(photo, noise))
+    assert success
+    return encoded.tobytes()
+
+
+def time_decode(contents: bytes, flag: int, options: FrameOptions, repeat: int):
+    nparr = np.frombuffer(contents, np.uint8)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decoded = cv2.imdecode(nparr, flag)
+        frame = resize_frame(decoded, options)
+        best = min(best, time.perf_counter() - start)
+    _, ids, _ = detector_pool.detect(frame)
+    return best, decoded.nbytes, 0 if ids is None else len(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--resize", choices=["fixed", "fit"], default="fixed")
+    args = parser.parse_args()
+    options = FrameOptions(resize=args.resize)
+
+    print(f"resize={args.resize}, best of {args.repeat}")
+    print(f"{'image':>14} {'mode':>5} {'ms':>8} {'decoded MB':>11} {'markers':>8} {'speedup':>8}")
+    for width, height in SIZES:
+        for ext in (".jpg", ".png"):
+            contents = make_photo(width, height, ext)
+            name = f"{width}x{height}{ext}"
+            full_time, full_bytes, full_markers = time_decode(contents, cv2.IMREAD_COLOR, options, args.repeat)
+            print(f"{name:>14} {'full':>5} {full_time * 1000:>8.1f} {full_bytes / 2**20:>11.1f} {full_markers:>8}")
+
+            flag = reduced_decode_flag(contents, options)
+            if flag == cv2.IMREAD_COLOR:
+                continue
+            reduced_time, reduced_bytes, reduced_markers = time_decode(contents, flag, options, args.repeat)
+            print(f"{name:>14} {FLAG_NAMES[flag]:>5} {reduced_time * 1000:>8.1f} "
+                  f"{reduced_bytes / 2**20:>11.1f} {reduced_markers:>8} {full_time / reduced_time:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
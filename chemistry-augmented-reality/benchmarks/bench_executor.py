@@ -0,0 +1,79 @@
+"""
+Throughput of the frame executor on the sample_markers images.
+
+Runs the /process_frame pipeline through FrameExecutor with an increasing
+number of workers and prints frames per second for each configuration:
+
+    python benchmarks/bench_executor.py --kind process --frames 200
+"""
+import argparse
+import asyncio
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api.executor import FrameExecutor
+from api.levels import level_registry
+from api.pipeline import process_image
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+
+def load_samples():
+    samples = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "sample_markers", "*.png"))):
+        with open(path, "rb") as f:
+            samples.append(f.read())
+    return samples
+
+
+async def run(executor: FrameExecutor, samples, level, frames: int) -> float:
+    executor.start()
+    # Warm every worker before timing
+    await asyncio.gather(*(executor.run(process_image, samples[0], level) for _ in range(executor.workers)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        executor.run(process_image, samples[i % len(samples)], level)
+        for i in range(frames)
+    ))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kind", choices=["thread", "process"], default="process")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--level", type=int, default=0)
+    args = parser.parse_args()
+
+    samples = load_samples()
+    level = level_registry.get(args.level)
+
+    workers = 1
+    counts = []
+    while workers < args.max_workers:
+        counts.append(workers)
+        workers *= 2
+    counts.append(args.max_workers)
+
+    print(f"{len(samples)} sample images, {args.frames} frames, {args.kind} pool")
+    print(f"{'workers':>8} {'seconds':>9} {'frames/s':>9} {'speedup':>8}")
+    baseline = None
+    for workers in counts:
+        executor = FrameExecutor(kind=args.kind, workers=workers, queue_depth=args.frames)
+        try:
+            elapsed = asyncio.run(run(executor, samples, level, args.frames))
+        finally:
+            executor.shutdown()
+        fps = args.frames / elapsed
+        baseline = baseline or fps
+        print(f"{workers:>8} {elapsed:>9.2f} {fps:>9.1f} {fps / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
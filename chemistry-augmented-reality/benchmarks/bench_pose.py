@@ -0,0 +1,178 @@
+"""
+Per-marker pose estimation versus camera.PoseEstimator in the desktop engine.
+
+Detects the markers of a synthetic camera sequence (see bench_tracking.py)
+once, then times the pose stage on those corners:
+
+- legacy: the previous solvePnPAruco, called per marker as ChemistryEngine did
+- marker: the current solvePnPAruco, called per marker
+- batched: one camera.PoseEstimator.estimate call per frame, which still
+  solves each marker but reuses the pose of markers that did not move
+
+It reports the time per marker, the peak memory allocated per frame, the
+largest frame-to-frame jump of a marker's translation (jitter) and, for the
+batched poses, how far they are from the per-marker ones. With the extreme
+distortion of the default calibration, sub-pixel corner noise can flip a
+per-marker solve between the two planar pose solutions, so on still scenes
+that difference is the per-marker jitter that reused poses avoid:
+
+    python benchmarks/bench_pose.py --frames 150 --markers 6
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_tracking import create_detector, make_sequence
+from chemistry_ar import camera
+
+MARKER_SIZE = 0.48
+SCENES = {"moving": 1.0, "slow": 0.1, "still": 0.0}
+
+
+def legacy_solvePnPAruco(corners, marker_size, mtx, distortion):
+    """camera.solvePnPAruco before the batched pose API, for comparison"""
+    marker_points = np.array(
+        [
+            [-marker_size / 2, marker_size / 2, 0],
+            [marker_size / 2, marker_size / 2, 0],
+            [marker_size / 2, -marker_size / 2, 0],
+            [-marker_size / 2, -marker_size / 2, 0],
+        ],
+        dtype=np.float32,
+    )
+    rvecs = np.empty((0, 1, 3))
+    tvecs = np.empty((0, 1, 3))
+    for corner in corners:
+        _, r, t = cv2.solvePnP(
+            marker_points, corner, mtx, distortion, useExtrinsicGuess=True, flags=cv2.SOLVEPNP_IPPE_SQUARE
+        )
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 1e-6)
+        r, t = cv2.solvePnPRefineLM(marker_points, corner, mtx, distortion, r, t, criteria=criteria)
+        rvecs = np.append(rvecs, r.reshape(1, 1, 3), axis=0)
+        tvecs = np.append(tvecs, t.reshape(1, 1, 3), axis=0)
+    return rvecs, tvecs
+
+
+def per_marker(detections, solve=camera.solvePnPAruco):
+    poses = []
+    for corners, ids in detections:
+        frame = {}
+        for i, marker_id in enumerate(ids.ravel()):
+            frame[marker_id] = solve(corners[i], MARKER_SIZE, camera.cameraMatrix, camera.distCoeffs)
+        poses.append(frame)
+    return poses
+
+
+def batched(detections, estimator):
+    poses = []
+    for corners, ids in detections:
+        rvecs, tvecs = estimator.estimate(corners, ids)
+        poses.append({
+            marker_id: (rvecs[i:i + 1].copy(), tvecs[i:i + 1].copy()) for i, marker_id in enumerate(ids.ravel())
+        })
+    return poses
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def allocated_per_frame(step, detections) -> float:
+    """Peak bytes allocated by one call of step(corners, ids), averaged over the frames"""
+    tracemalloc.start()
+    total = 0
+    for corners, ids in detections:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        step(corners, ids)
+        total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return total / len(detections)
+
+
+def pose_difference(poses, reference) -> tuple[float, float]:
+    """Largest rotation matrix and translation differences between two pose sequences"""
+    rotation = translation = 0.0
+    for frame, reference_frame in zip(poses, reference):
+        for marker_id, (r, t) in frame.items():
+            ref_r, ref_t = reference_frame[marker_id]
+            difference = cv2.Rodrigues(r.reshape(3))[0] - cv2.Rodrigues(ref_r.reshape(3))[0]
+            rotation = max(rotation, np.abs(difference).max())
+            translation = max(translation, np.abs(t - ref_t).max())
+    return rotation, translation
+
+
+def jitter(poses) -> float:
+    """Largest translation change of a marker between consecutive frames"""
+    largest = 0.0
+    for previous, frame in zip(poses, poses[1:]):
+        for marker_id, (_, t) in frame.items():
+            if marker_id in previous:
+                largest = max(largest, np.abs(t - previous[marker_id][1]).max())
+    return largest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--markers", type=int, default=6)
+    parser.add_argument("--size", default="1280x720")
+    args = parser.parse_args()
+    width, height = map(int, args.size.split("x"))
+
+    print(f"{args.size}, {args.frames} frames, {args.markers} markers")
+    print(f"{'scene':>7} {'mode':>8} {'us/marker':>10} {'peak B/frame':>13} {'jitter':>8} {'max dR':>8} "
+          f"{'max dt':>8} {'solved/reused':>14}")
+    for scene, speed in SCENES.items():
+        sequence, _ = make_sequence(width, height, args.frames, args.markers, speed=speed)
+        detector = create_detector()
+        detections = [detector.detectMarkers(frame)[:2] for frame in sequence]
+        detections = [(corners, ids) for corners, ids in detections if ids is not None]
+        markers = sum(len(ids) for _, ids in detections)
+
+        estimator = camera.PoseEstimator(MARKER_SIZE)
+        poses = {
+            "legacy": per_marker(detections, legacy_solvePnPAruco),
+            "marker": per_marker(detections),
+            "batched": batched(detections, estimator),
+        }
+        drot, dt = pose_difference(poses["batched"], poses["marker"])
+        times = {
+            "legacy": min(timed(per_marker, detections, legacy_solvePnPAruco) for _ in range(3)),
+            "marker": min(timed(per_marker, detections) for _ in range(3)),
+            "batched": min(timed(batched, detections, camera.PoseEstimator(MARKER_SIZE)) for _ in range(3)),
+        }
+
+        def marker_step(solve):
+            def step(corners, ids):
+                for i in range(len(ids)):
+                    solve(corners[i], MARKER_SIZE, camera.cameraMatrix, camera.distCoeffs)
+            return step
+
+        warm = camera.PoseEstimator(MARKER_SIZE)
+        warm.estimate(*detections[0])
+        allocated = {
+            "legacy": allocated_per_frame(marker_step(legacy_solvePnPAruco), detections),
+            "marker": allocated_per_frame(marker_step(camera.solvePnPAruco), detections),
+            "batched": allocated_per_frame(warm.estimate, detections),
+        }
+
+        for mode, seconds in times.items():
+            line = (f"{scene:>7} {mode:>8} {seconds / markers * 1e6:>10.1f} {allocated[mode]:>13.0f} "
+                    f"{jitter(poses[mode]):>8.3f}")
+            if mode == "batched":
+                line += f" {drot:>8.1e} {dt:>8.1e} {estimator.solved:>7}/{estimator.reused:<6}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Rendered pose error with detection below the render rate.
+
+Simulates markers moved by hand (smooth random translation and rotation),
+detected with noise at a given rate, and compares the pose drawn at each
+60 Hz render frame against the true one, and how much its motion between
+render frames differs from the true motion (jitter):
+
+- raw: a detection on every render frame, drawn as detected
+- hold: detection at --rate Hz, the last detection drawn until the next
+- filter: detection at --rate Hz, drawn as chemistry_ar.filters.PoseFilter
+  predicts it for the render time
+
+    python benchmarks/bench_pose_filter.py --rate 15 --seconds 20
+"""
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from chemistry_ar.filters import PoseFilter
+
+RENDER_RATE = 60
+
+
+def make_trajectory(seconds: float, markers: int, seed: int = 0):
+    """True (rvecs, tvecs) of each marker at every render frame, shaped (markers, frames, 3)"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * RENDER_RATE)) / RENDER_RATE
+    rvecs = np.empty((markers, len(t), 3))
+    tvecs = np.empty((markers, len(t), 3))
+    for m in range(markers):
+        tvecs[m] = [rng.uniform(-1, 1), rng.uniform(-0.5, 0.5), rng.uniform(2.0, 3.0)]
+        for axis in range(3):
+            # A few slow sine components per axis, like a hand sliding the marker
+            for _ in range(3):
+                amplitude = rng.uniform(0.05, 0.25) * (0.5 if axis == 2 else 1.0)
+                tvecs[m, :, axis] += amplitude * np.sin(2 * np.pi * rng.uniform(0.1, 0.8) * t + rng.uniform(0, 6.3))
+        spin = rng.uniform(0, 2 * np.pi) + 0.8 * np.sin(2 * np.pi * rng.uniform(0.1, 0.5) * t)
+        tilt = 0.3 * np.sin(2 * np.pi * rng.uniform(0.1, 0.5) * t)
+        for i in range(len(t)):
+            # Marker facing the camera (pi about x), spun about its normal and tilted
+            rotation = (cv2.Rodrigues(np.array([np.pi + tilt[i], 0.0, 0.0]))[0]
+                        @ cv2.Rodrigues(np.array([0.0, 0.0, spin[i]]))[0])
+            rvecs[m, i] = cv2.Rodrigues(rotation)[0].ravel()
+    return rvecs, tvecs
+
+
+def detect(rvec, tvec, rng, translation_noise: float, rotation_noise: float):
+    """A noisy detection of a pose"""
+    noise = cv2.Rodrigues(rng.normal(0, np.radians(rotation_noise), 3))[0]
+    rotation = noise @ cv2.Rodrigues(rvec)[0]
+    # Depth is the noisiest coordinate of a single-marker pose
+    tvec = tvec + rng.normal(0, translation_noise, 3) * np.array([1, 1, 3])
+    return cv2.Rodrigues(rotation)[0].reshape(1, 1, 3), tvec.reshape(1, 1, 3)
+
+
+def rotation_error(rvec, true_rvec) -> float:
+    """Angle in degrees between two rotations"""
+    relative = cv2.Rodrigues(np.asarray(rvec, dtype=np.float64).reshape(3))[0].T @ cv2.Rodrigues(true_rvec)[0]
+    return np.degrees(np.linalg.norm(cv2.Rodrigues(relative)[0]))
+
+
+def run(mode: str, rvecs, tvecs, rate: float, translation_noise: float, rotation_noise: float, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    interval = RENDER_RATE / rate if mode != "raw" else 1
+    t_errors, r_errors, jitter = [], [], []
+    detections = 0
+    for m in range(len(rvecs)):
+        pose_filter = PoseFilter()
+        drawn = (np.zeros((1, 1, 3)), np.zeros((1, 1, 3)))
+        next_detection = 0.0
+        previous = None
+        for i in range(rvecs.shape[1]):
+            timestamp = i / RENDER_RATE
+            if i >= next_detection:
+                next_detection += interval
+                detections += 1
+                rvec, tvec = detect(rvecs[m, i], tvecs[m, i], rng, translation_noise, rotation_noise)
+                if mode == "filter":
+                    pose_filter.update(rvec, tvec, timestamp)
+                else:
+                    drawn = (rvec, tvec)
+            if mode == "filter":
+                pose_filter.predict(timestamp, *drawn)
+            t_errors.append(np.linalg.norm(drawn[1].ravel() - tvecs[m, i]))
+            if previous is not None:
+                jitter.append(np.linalg.norm(drawn[1].ravel() - previous - (tvecs[m, i] - tvecs[m, i - 1])))
+            previous = drawn[1].ravel().copy()
+            r_errors.append(rotation_error(drawn[0], rvecs[m, i]))
+    seconds = rvecs.shape[1] / RENDER_RATE
+    return {
+        "detections_per_s": detections / len(rvecs) / seconds,
+        "t_mean": np.mean(t_errors),
+        "t_p95": np.percentile(t_errors, 95),
+        "r_mean": np.mean(r_errors),
+        "r_p95": np.percentile(r_errors, 95),
+        "jitter": np.mean(jitter),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=15, help="detection rate (Hz) of hold and filter")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--markers", type=int, default=4)
+    parser.add_argument("--translation-noise", type=float, default=0.005, help="detection noise (marker units)")
+    parser.add_argument("--rotation-noise", type=float, default=0.5, help="detection noise (degrees)")
+    args = parser.parse_args()
+
+    rvecs, tvecs = make_trajectory(args.seconds, args.markers)
+    print(f"{args.markers} markers, {args.seconds:g} s rendered at {RENDER_RATE} Hz, detection at {args.rate:g} Hz")
+    print(f"{'mode':>7} {'detect/s':>9} {'t mean':>8} {'t p95':>8} {'deg mean':>9} {'deg p95':>8} {'jitter':>8}")
+    for mode in ("raw", "hold", "filter"):
+        result = run(mode, rvecs, tvecs, args.rate, args.translation_noise, args.rotation_noise)
+        print(f"{mode:>7} {result['detections_per_s']:>9.1f} {result['t_mean']:>8.4f} {result['t_p95']:>8.4f} "
+              f"{result['r_mean']:>9.2f} {result['r_p95']:>8.2f} {result['jitter']:>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Full-resolution versus pyramid marker detection on large camera frames.
+
+Runs the synthetic camera sequences of bench_tracking.py at 1080p and 4K
+through full-resolution detectMarkers (with subpixel corner refinement, as
+ChemistryEngine configures it) and through chemistry_ar.tracking.PyramidDetector
+at a few detection widths, and reports the time per frame, the recall, the
+corner error against the true corners and the pose error against the poses
+solved from the true corners (with camera.calibrationFor the frame size):
+
+    python benchmarks/bench_pyramid.py --frames 40 --markers 6
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_tracking import create_detector, make_sequence, score
+from chemistry_ar import camera
+from chemistry_ar.tracking import PyramidDetector
+
+SIZES = [(1920, 1080), (3840, 2160)]
+WIDTHS = [1280, 960, 640]
+MARKER_SIZE = 0.48
+
+
+def pose_errors(corners, ids, truth: dict, matrix, distortion) -> tuple[list, list]:
+    """Translation and rotation (degrees) differences to the poses of the true corners"""
+    t_errors, r_errors = [], []
+    if ids is None:
+        return t_errors, r_errors
+    for corner, marker_id in zip(corners, ids.ravel()):
+        expected = truth.get(int(marker_id))
+        if expected is None:
+            continue
+        rvecs, tvecs = camera.solvePnPAruco(corner, MARKER_SIZE, matrix, distortion)
+        true_rvecs, true_tvecs = camera.solvePnPAruco(expected[None], MARKER_SIZE, matrix, distortion)
+        t_errors.append(np.linalg.norm(tvecs - true_tvecs))
+        relative = cv2.Rodrigues(rvecs.reshape(3))[0].T @ cv2.Rodrigues(true_rvecs.reshape(3))[0]
+        r_errors.append(np.degrees(np.linalg.norm(cv2.Rodrigues(relative)[0])))
+    return t_errors, r_errors
+
+
+def run(detect, sequence, truth, calibration) -> dict:
+    times, errors, t_errors, r_errors = [], [], [], []
+    hits = total = 0
+    for frame, expected in zip(sequence, truth):
+        start = time.perf_counter()
+        corners, ids, _ = detect(frame)
+        times.append(time.perf_counter() - start)
+        frame_hits, frame_errors = score(corners, ids, expected)
+        hits += frame_hits
+        total += len(expected)
+        errors.extend(frame_errors)
+        frame_t, frame_r = pose_errors(corners, ids, expected, *calibration)
+        t_errors.extend(frame_t)
+        r_errors.extend(frame_r)
+    return {
+        "mean_ms": np.mean(times) * 1000,
+        "recall": hits / total,
+        "error_px": np.mean(errors) if errors else float("nan"),
+        "t_error": np.median(t_errors) if t_errors else float("nan"),
+        "r_error": np.median(r_errors) if r_errors else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=40)
+    parser.add_argument("--markers", type=int, default=6)
+    args = parser.parse_args()
+
+    print(f"{args.frames} frames, {args.markers} markers; pose errors are medians")
+    print(f"{'size':>10} {'mode':>12} {'mean ms':>8} {'recall':>7} {'err px':>7} {'dt':>8} {'deg':>6} "
+          f"{'speedup':>8}")
+    for width, height in SIZES:
+        sequence, truth = make_sequence(width, height, args.frames, args.markers)
+        calibration = camera.calibrationFor(width, height)
+        detector = create_detector()
+        # Warm up OpenCV's thread pool before timing
+        detector.detectMarkers(sequence[0])
+
+        results = {"full": run(detector.detectMarkers, sequence, truth, calibration)}
+        for detection_width in WIDTHS:
+            pyramid = PyramidDetector(create_detector(), detection_width)
+            results[f"pyramid {detection_width}"] = run(pyramid.detectMarkers, sequence, truth, calibration)
+
+        name = f"{width}x{height}"
+        for mode, result in results.items():
+            speedup = results["full"]["mean_ms"] / result["mean_ms"]
+            print(f"{name:>10} {mode:>12} {result['mean_ms']:>8.2f} {result['recall']:>7.3f} "
+                  f"{result['error_px']:>7.3f} {result['t_error']:>8.4f} {result['r_error']:>6.2f} {speedup:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
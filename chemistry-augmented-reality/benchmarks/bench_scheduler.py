@@ -0,0 +1,89 @@
+"""
+Detection on every frame versus the motion-gated DetectionScheduler.
+
+Runs the detection stage of the desktop engine (TrackingDetector and
+PoseEstimator) over synthetic camera sequences (see bench_tracking.py) with
+still, slowly moving, moving and half-still/half-moving markers, once on
+every frame and once only on the frames chemistry_ar.tracking.DetectionScheduler
+picks. Reports the CPU time per frame, the recall of the markers in use on
+each frame (the last detected ones on skipped frames) and the scheduler's
+skip statistics:
+
+    python benchmarks/bench_scheduler.py --frames 150 --markers 6
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_tracking import create_detector, make_sequence, score
+from chemistry_ar import camera
+from chemistry_ar.tracking import DetectionScheduler, TrackingDetector
+
+MARKER_SIZE = 0.48
+CAMERA_RATE = 30
+
+
+def make_scenes(width: int, height: int, frames: int, markers: int) -> dict:
+    still, still_truth = make_sequence(width, height, frames, markers, speed=0.0)
+    slow, slow_truth = make_sequence(width, height, frames, markers, speed=0.1)
+    moving, moving_truth = make_sequence(width, height, frames, markers)
+    half = frames // 2
+    # The moving sequence starts where the still one stays
+    return {
+        "still": (still, still_truth),
+        "slow": (slow, slow_truth),
+        "moving": (moving, moving_truth),
+        "mixed": (still[:half] + moving[:frames - half], still_truth[:half] + moving_truth[:frames - half]),
+    }
+
+
+def run(sequence, truth, scheduler: DetectionScheduler | None) -> dict:
+    detector = TrackingDetector(create_detector())
+    estimator = camera.PoseEstimator(MARKER_SIZE)
+    corners, ids = (), None
+    hits = total = 0
+    start = time.process_time()
+    for frame, expected in zip(sequence, truth):
+        if scheduler is None or scheduler.due(frame, 1 / CAMERA_RATE):
+            detection_start = time.perf_counter()
+            corners, ids = detector.detect(frame)
+            if ids is not None:
+                estimator.estimate(corners, ids)
+            if scheduler is not None:
+                scheduler.record_detection(time.perf_counter() - detection_start)
+        frame_hits, _ = score(corners, ids, expected)
+        hits += frame_hits
+        total += len(expected)
+    return {"cpu_ms": (time.process_time() - start) / len(sequence) * 1000, "recall": hits / total}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--markers", type=int, default=6)
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--rate", type=float, default=0, help="detection rate limit of the scheduler (0: none)")
+    args = parser.parse_args()
+    width, height = map(int, args.size.split("x"))
+
+    print(f"{args.size} at {CAMERA_RATE} fps, {args.frames} frames, {args.markers} markers")
+    print(f"{'scene':>7} {'mode':>6} {'cpu ms':>7} {'recall':>7} {'skips':>6} {'static':>7} {'check ms':>9} "
+          f"{'saved s':>8}")
+    for scene, (sequence, truth) in make_scenes(width, height, args.frames, args.markers).items():
+        # Warm up OpenCV's thread pool before timing
+        create_detector().detectMarkers(sequence[0])
+        every = run(sequence, truth, None)
+        scheduler = DetectionScheduler(args.rate)
+        gated = run(sequence, truth, scheduler)
+        stats = scheduler.stats()
+        print(f"{scene:>7} {'every':>6} {every['cpu_ms']:>7.2f} {every['recall']:>7.3f}")
+        print(f"{scene:>7} {'gated':>6} {gated['cpu_ms']:>7.2f} {gated['recall']:>7.3f} "
+              f"{stats['skip_rate']:>6.2f} {stats['static_skip_rate']:>7.2f} {stats['motion_check_ms']:>9.3f} "
+              f"{stats['saved_seconds']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
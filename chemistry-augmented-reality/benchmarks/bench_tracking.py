@@ -0,0 +1,171 @@
+"""
+Full-frame versus ROI-tracked marker detection of the desktop engine.
+
+Renders a synthetic camera sequence (markers drifting and turning over a
+textured table at a known position), runs it through full-frame
+detectMarkers and through chemistry_ar.tracking.TrackingDetector, and
+reports the time per frame and the recall against the true corners:
+
+    python benchmarks/bench_tracking.py --frames 150 --markers 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from chemistry_ar.tracking import TrackingDetector
+
+SIZES = [(1280, 720), (1920, 1080)]
+# A detection counts when its corners are this close to the true ones
+MATCH_PIXELS = 4.0
+
+
+def create_detector() -> cv2.aruco.ArucoDetector:
+    """Detector configured like ChemistryEngine's"""
+    dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_6X6_250)
+    params = cv2.aruco.DetectorParameters()
+    params.cornerRefinementMethod = cv2.aruco.CORNER_REFINE_SUBPIX
+    return cv2.aruco.ArucoDetector(dictionary, params)
+
+
+def make_sequence(width: int, height: int, frames: int, markers: int, seed: int = 0, speed: float = 1.0):
+    """
+    Grayscale frames of markers moving over a textured background
+    (`speed` scales their motion; 0 keeps them still).
+
+    Returns:
+        (frames, truth) where truth[i] maps each marker id to its (4, 2)
+        corners in frame i
+    """
+    rng = np.random.default_rng(seed)
+    dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_6X6_250)
+    scale = height / 720
+    side = int(110 * scale)
+    border = side // 6
+    # Marker with its white quiet zone; its corners in that image
+    source_corners = np.array(
+        [[border, border], [border + side, border], [border + side, border + side], [border, border + side]],
+        dtype=np.float32,
+    )
+
+    texture = rng.integers(0, 255, (height // 16 + 1, width // 16 + 1), dtype=np.uint8)
+    background = cv2.resize(texture, (width, height), interpolation=cv2.INTER_CUBIC)
+    background = cv2.addWeighted(background, 0.4, np.full_like(background, 120), 0.6, 0)
+
+    tiles = [
+        cv2.copyMakeBorder(cv2.aruco.generateImageMarker(dictionary, marker_id, side),
+                           border, border, border, border, cv2.BORDER_CONSTANT, value=255)
+        for marker_id in range(markers)
+    ]
+    columns = int(np.ceil(np.sqrt(markers)))
+    rows = int(np.ceil(markers / columns))
+    centers = np.array([
+        [(i % columns + 0.5) * width / columns, (i // columns + 0.5) * height / rows] for i in range(markers)
+    ])
+    velocities = rng.uniform(1.0, 4.0, (markers, 2)) * scale * rng.choice([-1, 1], (markers, 2)) * speed
+    angles = rng.uniform(0, 2 * np.pi, markers)
+    spins = rng.uniform(-0.02, 0.02, markers) * speed
+    half = side * 0.75
+
+    sequence, truth = [], []
+    for _ in range(frames):
+        frame = background.copy()
+        corners = {}
+        for marker_id, tile in enumerate(tiles):
+            cos, sin = np.cos(angles[marker_id]), np.sin(angles[marker_id])
+            rotation = np.array([[cos, -sin], [sin, cos]])
+            square = (np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]]) * side / 2) @ rotation.T
+            outer = (square * (side + 2 * border) / side + centers[marker_id]).astype(np.float32)
+            outer_source = np.array(
+                [[0, 0], [side + 2 * border, 0], [side + 2 * border, side + 2 * border], [0, side + 2 * border]],
+                dtype=np.float32,
+            )
+            warp = cv2.getPerspectiveTransform(outer_source, outer)
+            cv2.warpPerspective(tile, warp, (width, height), dst=frame, borderMode=cv2.BORDER_TRANSPARENT)
+            corners[marker_id] = cv2.perspectiveTransform(source_corners[None], warp)[0]
+
+            # Bounce off the frame edges
+            centers[marker_id] += velocities[marker_id]
+            for axis, limit in ((0, width), (1, height)):
+                if not half * 1.5 < centers[marker_id][axis] < limit - half * 1.5:
+                    velocities[marker_id][axis] *= -1
+            angles[marker_id] += spins[marker_id]
+        # Camera blur and sensor noise
+        frame = cv2.GaussianBlur(frame, (3, 3), 0)
+        frame = cv2.add(frame, rng.integers(0, 6, frame.shape, dtype=np.uint8))
+        sequence.append(frame)
+        truth.append(corners)
+    return sequence, truth
+
+
+def score(corners, ids, truth: dict) -> tuple[int, list]:
+    """Markers found at their true position, and their corner errors"""
+    if ids is None:
+        return 0, []
+    hits, errors = 0, []
+    for corner, marker_id in zip(corners, ids.ravel()):
+        expected = truth.get(int(marker_id))
+        if expected is None:
+            continue
+        error = np.linalg.norm(corner.reshape(4, 2) - expected, axis=1).mean()
+        if error <= MATCH_PIXELS:
+            hits += 1
+            errors.append(error)
+    return hits, errors
+
+
+def run(detect, sequence, truth) -> dict:
+    times, errors = [], []
+    hits = total = 0
+    for frame, expected in zip(sequence, truth):
+        start = time.perf_counter()
+        corners, ids = detect(frame)
+        times.append(time.perf_counter() - start)
+        frame_hits, frame_errors = score(corners, ids, expected)
+        hits += frame_hits
+        total += len(expected)
+        errors.extend(frame_errors)
+    return {
+        "mean_ms": np.mean(times) * 1000,
+        "p95_ms": np.percentile(times, 95) * 1000,
+        "recall": hits / total,
+        "error_px": np.mean(errors) if errors else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--markers", type=int, default=4)
+    parser.add_argument("--interval", type=int, default=TrackingDetector.FULL_SCAN_INTERVAL,
+                        help="frames between full scans of the tracked detector")
+    args = parser.parse_args()
+
+    print(f"{args.frames} frames, {args.markers} markers, full scan every {args.interval} frames")
+    print(f"{'size':>10} {'mode':>8} {'mean ms':>8} {'p95 ms':>8} {'recall':>7} {'err px':>7} {'speedup':>8}")
+    for width, height in SIZES:
+        sequence, truth = make_sequence(width, height, args.frames, args.markers)
+        detector = create_detector()
+        # Warm up OpenCV's thread pool before timing
+        detector.detectMarkers(sequence[0])
+
+        full = run(lambda frame: detector.detectMarkers(frame)[:2], sequence, truth)
+        tracker = TrackingDetector(create_detector(), full_scan_interval=args.interval)
+        tracked = run(tracker.detect, sequence, truth)
+
+        name = f"{width}x{height}"
+        for mode, result in (("full", full), ("tracked", tracked)):
+            speedup = full["mean_ms"] / result["mean_ms"]
+            print(f"{name:>10} {mode:>8} {result['mean_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                  f"{result['recall']:>7.3f} {result['error_px']:>7.3f} {speedup:>7.2f}x")
+        print(f"{'':>10} {'':>8} full scans {tracker.full_scans}/{tracker.frames}, "
+              f"markers lost {tracker.markers_lost}")
+
+
+if __name__ == "__main__":
+    main()
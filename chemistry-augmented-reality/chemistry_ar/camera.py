@@ -1,4 +1,5 @@
 from cv2.typing import MatLike
+from functools import lru_cache
 import numpy as np
 import cv2
 
@@ -29,17 +30,42 @@ distCoeffs = np.array(
 )
 
 
-def solvePnPAruco(corners, marker_size, mtx, distortion):
+# Frame size cameraMatrix was calibrated at
+CALIBRATION_SIZE = (640, 480)
+
+
+@lru_cache(maxsize=16)
+def calibrationFor(width: int, height: int):
+    """[Camera intrinsics scaled to a frame size, keeping square pixels]
+
+    The distortion coefficients apply to normalized coordinates, so they
+    are the same at every size. The arrays are shared between calls and
+    must not be modified.
+
+    Returns:
+        [tuple] -- [(camera matrix, distortion coefficients)]
     """
-    This will estimate the rvec and tvec for each of the marker corners detected by:
-       corners, ids, rejectedImgPoints = detector.detectMarkers(image)
-    corners - is an array of detected corners for each detected marker in the image
-    marker_size - is the size of the detected markers
-    mtx - is the camera matrix
-    distortion - is the camera distortion matrix
-    RETURN list of rvecs, tvecs, and trash (so that it corresponds to the old estimatePoseSingleMarkers())
+    matrix = cameraMatrix.copy()
+    focal_scale = width / CALIBRATION_SIZE[0]
+    matrix[0, 0] *= focal_scale
+    matrix[1, 1] *= focal_scale
+    matrix[0, 2] *= width / CALIBRATION_SIZE[0]
+    matrix[1, 2] *= height / CALIBRATION_SIZE[1]
+    matrix.flags.writeable = False
+    return matrix, distCoeffs
+
+
+# Termination criteria of the Levenberg-Marquardt pose refinement
+POSE_REFINE_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 1e-6)
+
+
+@lru_cache(maxsize=8)
+def markerObjectPoints(marker_size: float) -> np.ndarray:
+    """[Corners of a marker in its own coordinate system, in ArUco order]
+
+    The array is shared between calls and must not be modified.
     """
-    marker_points = np.array(
+    points = np.array(
         [
             [-marker_size / 2, marker_size / 2, 0],
             [marker_size / 2, marker_size / 2, 0],
@@ -48,33 +74,153 @@ def solvePnPAruco(corners, marker_size, mtx, distortion):
         ],
         dtype=np.float32,
     )
+    points.flags.writeable = False
+    return points
+
+
+def solvePnPAruco(corners, marker_size, mtx, distortion):
+    """
+    This will estimate the rvec and tvec for each of the marker corners detected by:
+       corners, ids, rejectedImgPoints = detector.detectMarkers(image)
+    corners - is an array of detected corners for each detected marker in the image
+    marker_size - is the size of the detected markers
+    mtx - is the camera matrix
+    distortion - is the camera distortion matrix
+    RETURN list of rvecs, tvecs, and trash (so that it corresponds to the old estimatePoseSingleMarkers())
+    """
+    marker_points = markerObjectPoints(marker_size)
 
-    rvecs = np.empty((0, 1, 3))
-    tvecs = np.empty((0, 1, 3))
-    for corner in corners:
-        _, r, t = cv2.solvePnP(
+    rvecs = np.empty((len(corners), 1, 3))
+    tvecs = np.empty((len(corners), 1, 3))
+    for i, corner in enumerate(corners):
+        r = rvecs[i].reshape(3, 1)
+        t = tvecs[i].reshape(3, 1)
+        # Both calls write into the views of the result arrays
+        cv2.solvePnP(
             marker_points,
             corner,
             mtx,
             distortion,
-            useExtrinsicGuess=True,
+            rvec=r,
+            tvec=t,
             flags=cv2.SOLVEPNP_IPPE_SQUARE,
         )
-        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 1e-6)
-        r, t = cv2.solvePnPRefineLM(
+        cv2.solvePnPRefineLM(
             marker_points,
             corner,
             mtx,
             distortion,
             r,
             t,
-            criteria=criteria,
+            criteria=POSE_REFINE_CRITERIA,
         )
-        rvecs = np.append(rvecs, r.reshape(1, 1, 3), axis=0)
-        tvecs = np.append(tvecs, t.reshape(1, 1, 3), axis=0)
     return rvecs, tvecs
 
 
+class PoseEstimator:
+    """
+    Poses of every marker of a frame, written into (N, 1, 3) rvec/tvec
+    buffers reused across frames.
+
+    Each marker is still solved with its own solvePnP and solvePnPRefineLM
+    call, which dominate the cost. The gain is on still scenes: the last
+    corners and pose of every marker id are kept, and a marker whose
+    corners have not moved since the previous frame keeps its pose without
+    solving.
+    """
+
+    # Corners that moved less than this (in pixels) keep the previous pose
+    REUSE_TOLERANCE = 0.05
+
+    def __init__(
+        self,
+        marker_size: float,
+        mtx: np.ndarray = cameraMatrix,
+        distortion: np.ndarray = distCoeffs,
+        capacity: int = 16,
+    ):
+        self.marker_points = markerObjectPoints(marker_size)
+        self.mtx = mtx
+        self.distortion = distortion
+        self._grow(capacity)
+        # Marker id -> (corners, rvec, tvec) of the last frame it was seen in
+        self._previous = {}
+
+        # Statistics
+        self.solved = 0
+        self.reused = 0
+
+    def _grow(self, capacity: int) -> None:
+        self.rvecs = np.zeros((capacity, 1, 3))
+        self.tvecs = np.zeros((capacity, 1, 3))
+        # (3, 1) views of each row, which solvePnP writes into
+        self._r = [r.reshape(3, 1) for r in self.rvecs]
+        self._t = [t.reshape(3, 1) for t in self.tvecs]
+
+    def reset(self) -> None:
+        self._previous.clear()
+
+    def estimate(self, corners, ids):
+        """[Estimate the pose of every detected marker]
+
+        Arguments:
+            corners {[tuple]} -- [(1, 4, 2) corners of each marker, as returned by detectMarkers]
+            ids {[np.ndarray]} -- [(N, 1) marker ids]
+
+        Returns:
+            [tuple] -- [(N, 1, 3) rvecs and tvecs, views of buffers reused by the next call]
+        """
+        n = len(corners)
+        if n > len(self.rvecs):
+            self._grow(2 * n)
+
+        for i, marker_id in enumerate(ids.ravel().tolist()):
+            corner = corners[i]
+            r = self._r[i]
+            t = self._t[i]
+            previous = self._previous.get(marker_id)
+
+            # Largest corner coordinate change, without numpy temporaries
+            if previous is not None and cv2.norm(corner, previous[0], cv2.NORM_INF) <= self.REUSE_TOLERANCE:
+                np.copyto(r, previous[1])
+                np.copyto(t, previous[2])
+                self.reused += 1
+                continue
+
+            # Both calls write into the views of the buffers
+            cv2.solvePnP(
+                self.marker_points,
+                corner,
+                self.mtx,
+                self.distortion,
+                rvec=r,
+                tvec=t,
+                flags=cv2.SOLVEPNP_IPPE_SQUARE,
+            )
+            cv2.solvePnPRefineLM(
+                self.marker_points,
+                corner,
+                self.mtx,
+                self.distortion,
+                r,
+                t,
+                criteria=POSE_REFINE_CRITERIA,
+            )
+            self.solved += 1
+
+            if previous is None:
+                previous = self._previous[marker_id] = (
+                    np.empty(corner.shape, dtype=np.float32),
+                    np.empty((3, 1)),
+                    np.empty((3, 1)),
+                )
+            np.copyto(previous[0], corner)
+            np.copyto(previous[1], r)
+            np.copyto(previous[2], t)
+
+        return self.rvecs[:n], self.tvecs[:n]
+
+
 def extrinsic2ModelView(
     RVEC: np.ndarray, TVEC: np.ndarray, offset: np.ndarray = np.array([0.0, 0.0, 0.0])
 ) -> MatLike:
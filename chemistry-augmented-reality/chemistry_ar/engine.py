@@ -1,4 +1,5 @@
 import os
+import time
 import cv2
 import moderngl
 import numpy as np
@@ -12,6 +13,7 @@ from .cluster import Cluster
 from .speech import TTS, SpeechRecognizer
 from .users.db import DatabaseManager
 from .shapes.rectangle import Rectangle
+from .tracking import TrackingDetector, DetectionScheduler, PyramidDetector
 
 class ChemistryEngine:
     MARKER_SIZE = 0.48
@@ -19,6 +21,13 @@ class ChemistryEngine:
     CLUSTER_THRESHOLD = 1.6
     LOOP_DELAY = 1.0
     CLUSTER_VALID_SOLUTION = 3  # Seconds needed to merge into solution
+    # Marker detections per second (0: every frame); the poses of the frames
+    # in between are predicted by the markers' pose filters. Detection is
+    # also skipped while the camera image does not change
+    DETECTION_RATE = float(os.environ.get("DETECTION_RATE", 15))
+    # Frames wider than this are detected downscaled and their corners
+    # refined at full resolution (0: detect at full resolution)
+    DETECTION_WIDTH = int(os.environ.get("DETECTION_WIDTH", 0))
 
     def __init__(self, ctx, width, height):
         self.ctx = ctx
@@ -35,8 +44,24 @@ class ChemistryEngine:
         self.aruco_dict = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_6X6_250)
         self.aruco_params = cv2.aruco.DetectorParameters()
         self.aruco_params.cornerRefinementMethod = cv2.aruco.CORNER_REFINE_SUBPIX
+        aruco_detector = cv2.aruco.ArucoDetector(self.aruco_dict, self.aruco_params)
+        if self.DETECTION_WIDTH > 0:
+            aruco_detector = PyramidDetector(aruco_detector, self.DETECTION_WIDTH)
+        # Searches around the markers of the last frame, with periodic full scans
+        self.marker_detector = TrackingDetector(aruco_detector)
+        # Calibration of the capture size, until the first frame tells it
+        self.frame_size = (self.width, self.height)
+        self.camera_matrix, self.dist_coeffs = camera.calibrationFor(*self.frame_size)
+        self.pose_estimator = camera.PoseEstimator(
+            self.MARKER_SIZE, self.camera_matrix, self.dist_coeffs
+        )
+        self.detection_scheduler = DetectionScheduler(self.DETECTION_RATE)
+        self.clock = 0.0
         self.projection_matrix = camera.intrinsic2Project(
-            self.width, self.height, near_plane=1.0, far_plane=1000.0
+            *self.frame_size,
+            near_plane=1.0,
+            far_plane=1000.0,
+            MTX=self.camera_matrix,
         )
         self.level_completed = False
 
@@ -57,6 +82,7 @@ class ChemistryEngine:
     def load_level(self, level_number: int) -> None:
         # Reset the markers
         self.markers = dict()
+        self.detection_scheduler.reset()
         self.game_levels.set_current_level(level_number)
         self.level_markers = self.game_levels.get_current_level().get_markers()
         if self.user is not None:
@@ -167,7 +193,38 @@ class ChemistryEngine:
 
         self.merged_molecule_cluster = []
 
-    def update_markers(self, frame_markers: Dict[int, Tuple[np.ndarray, np.ndarray]]):
+    def update_calibration(self, frame) -> None:
+        """Switch to the calibration of the frame's size when the capture size changes"""
+        height, width = frame.shape[:2]
+        if (width, height) == self.frame_size:
+            return
+        self.frame_size = (width, height)
+        self.camera_matrix, self.dist_coeffs = camera.calibrationFor(width, height)
+        self.pose_estimator = camera.PoseEstimator(
+            self.MARKER_SIZE, self.camera_matrix, self.dist_coeffs
+        )
+        # In place: the markers and molecules hold this array
+        np.copyto(
+            self.projection_matrix,
+            camera.intrinsic2Project(
+                width,
+                height,
+                near_plane=1.0,
+                far_plane=1000.0,
+                MTX=self.camera_matrix,
+            ),
+        )
+        self.marker_detector.reset()
+        self.detection_scheduler.reset()
+
+    def get_detection_stats(self) -> dict:
+        return self.detection_scheduler.stats()
+
+    def update_markers(
+        self,
+        frame_markers: Dict[int, Tuple[np.ndarray, np.ndarray]],
+        timestamp: float = 0.0,
+    ):
         # Create and update the found markers
         for marker_id, marker_pos in frame_markers.items():
             if marker_id not in self.markers:
@@ -179,26 +236,30 @@ class ChemistryEngine:
                         marker_extrinsics=marker_pos,
                         projection_matrix=self.projection_matrix,
                         level_marker=self.level_markers.pop(),
+                        timestamp=timestamp,
                     )
                 # "CC(=O)NCCC1=CNc2c1cc(OC)cc2",
                 # self.markers[marker_id].create_molecule()
             else:
-                self.markers[marker_id].update_marker_pos(marker_pos)
-                self.markers[marker_id].update_marker_state(MarkerState.ACTIVE)
+                self.markers[marker_id].update_marker_pos(marker_pos, timestamp)
+                self.markers[marker_id].update_marker_state(MarkerState.ACTIVE, timestamp)
 
         # Check if any marker is lost
         for marker_id, _ in self.markers.items():
             if marker_id not in frame_markers:
-                self.markers[marker_id].update_marker_state(MarkerState.NOT_FOUND)
-                if self.markers[marker_id].get_marker_state() == MarkerState.INACTIVE:
-                    self.markers[marker_id].delete()
-
-        # Delete inactive markers
-        for marker in self.markers.copy():
-            if self.markers[marker].get_marker_state() == MarkerState.INACTIVE:
+                self.markers[marker_id].update_marker_state(MarkerState.NOT_FOUND, timestamp)
+
+    def remove_inactive_markers(self, timestamp: float):
+        # Lost markers time out in seconds, so they go after the same time
+        # whether or not detection ran on the frames in between
+        for marker_id in self.markers.copy():
+            marker = self.markers[marker_id]
+            marker.check_inactive(timestamp)
+            if marker.get_marker_state() == MarkerState.INACTIVE:
+                marker.delete()
                 # Append the level marker back to the level markers list
-                self.level_markers.append(self.markers[marker].level_marker)
-                del self.markers[marker]
+                self.level_markers.append(marker.level_marker)
+                del self.markers[marker_id]
 
     def draw_markers_text(self, frame):
         for marker in self.markers:
@@ -208,8 +269,8 @@ class ChemistryEngine:
                     np.array([0, 0, 0], dtype=np.float32),
                     marker_extrinsics[0][0],
                     marker_extrinsics[1][0],
-                    camera.cameraMatrix,
-                    camera.distCoeffs,
+                    self.camera_matrix,
+                    self.dist_coeffs,
                 )
                 cv2.putText(
                     frame,
@@ -250,6 +311,7 @@ class ChemistryEngine:
         # frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
         self.last_loop_time += frame_time
+        self.clock += frame_time
         # Perform checks every LOOP_DELAY seconds
         if self.last_loop_time >= self.LOOP_DELAY:
             self.last_loop_time -= self.LOOP_DELAY
@@ -313,34 +375,43 @@ class ChemistryEngine:
             frame = cv2.flip(frame, 0)
             self.background.render(frame.tobytes())
         else:
-            # Convertir a escala de grises para mejorar la detección
-            frame_gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
-            
-            corners, ids, _ = cv2.aruco.detectMarkers(
-                frame_gray, self.aruco_dict, parameters=self.aruco_params
-            )
-            frame_markers = dict()
-            if ids is not None:  # Si se detectó algún marcador
-                for i in range(len(ids)):
-                    aruco_id = ids[i][0]
-                    rvecs, tvecs = camera.solvePnPAruco(
-                        corners[i],
-                        self.MARKER_SIZE,
-                        camera.cameraMatrix,
-                        camera.distCoeffs,
-                    )
-                    frame_markers[aruco_id] = (rvecs, tvecs)
-                    if self.DEBUG:
-                        cv2.drawFrameAxes(
-                            frame,
-                            camera.cameraMatrix,
-                            camera.distCoeffs,
-                            rvecs,
-                            tvecs,
-                            0.1,
-                        )
-
-            self.update_markers(frame_markers)
+            self.update_calibration(frame)
+            if self.detection_scheduler.due(frame, frame_time):
+                detection_start = time.perf_counter()
+                # Convertir a escala de grises para mejorar la detección
+                frame_gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+
+                corners, ids = self.marker_detector.detect(frame_gray)
+                frame_markers = dict()
+                if ids is not None:  # Si se detectó algún marcador
+                    # One call for all poses of the frame. The buffers are reused
+                    # next frame, so the markers copy their pose out of them
+                    rvecs, tvecs = self.pose_estimator.estimate(corners, ids)
+                    for i in range(len(ids)):
+                        aruco_id = ids[i][0]
+                        frame_markers[aruco_id] = (rvecs[i : i + 1], tvecs[i : i + 1])
+                        if self.DEBUG:
+                            cv2.drawFrameAxes(
+                                frame,
+                                self.camera_matrix,
+                                self.dist_coeffs,
+                                rvecs[i],
+                                tvecs[i],
+                                0.1,
+                            )
+
+                self.detection_scheduler.record_detection(
+                    time.perf_counter() - detection_start
+                )
+                self.update_markers(frame_markers, self.clock)
+            elif self.detection_scheduler.static:
+                for marker in self.markers.values():
+                    marker.hold_marker_pos(self.clock)
+            else:
+                for marker in self.markers.values():
+                    marker.predict_marker_pos(self.clock)
+            self.remove_inactive_markers(self.clock)
+
             frame = self.draw_markers_text(frame)
             frame = self.draw_objective_text(frame)
             frame = cv2.flip(frame, 0)
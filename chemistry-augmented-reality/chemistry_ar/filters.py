@@ -0,0 +1,147 @@
+import math
+import numpy as np
+
+
+def _smoothing(cutoff: float, dt: float) -> float:
+    """Exponential smoothing factor of a low-pass filter with this cutoff (Hz)"""
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+def rvec_to_quaternion(rvec: np.ndarray) -> np.ndarray:
+    """(w, x, y, z) unit quaternion of a Rodrigues rotation vector"""
+    rvec = np.asarray(rvec, dtype=np.float64).reshape(3)
+    angle = np.linalg.norm(rvec)
+    if angle < 1e-12:
+        return np.array([1.0, 0.0, 0.0, 0.0])
+    return np.concatenate(([math.cos(angle / 2)], rvec / angle * math.sin(angle / 2)))
+
+
+def quaternion_to_rvec(quaternion: np.ndarray, out: np.ndarray) -> None:
+    """Write the Rodrigues rotation vector of a quaternion into `out` (3 elements)"""
+    w, xyz = quaternion[0], quaternion[1:]
+    # Take the short way round, like cv2.Rodrigues (angle in [0, pi])
+    if w < 0:
+        w, xyz = -w, -xyz
+    sin = np.linalg.norm(xyz)
+    if sin < 1e-12:
+        out.reshape(3)[:] = 0.0
+        return
+    out.reshape(3)[:] = xyz * (2 * math.atan2(sin, w) / sin)
+
+
+class OneEuroFilter:
+    """
+    One-euro filter of a vector signal (Casiez et al., CHI 2012).
+
+    A low-pass filter whose cutoff rises with the speed of the signal:
+    little jitter when it is still, little lag when it moves. The filtered
+    velocity is kept, so the signal can be extrapolated.
+    """
+
+    def __init__(self, min_cutoff: float, beta: float, d_cutoff: float = 1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.value = None
+        self.velocity = None
+        self.timestamp = None
+
+    def reset(self) -> None:
+        self.value = self.velocity = self.timestamp = None
+
+    def update(self, x: np.ndarray, timestamp: float) -> np.ndarray:
+        if self.value is None:
+            self.value = np.array(x, dtype=np.float64)
+            self.velocity = np.zeros_like(self.value)
+            self.timestamp = timestamp
+            return self.value
+
+        dt = timestamp - self.timestamp
+        if dt <= 0:
+            return self.value
+        self.timestamp = timestamp
+
+        self.velocity += _smoothing(self.d_cutoff, dt) * ((x - self.value) / dt - self.velocity)
+        cutoff = self.min_cutoff + self.beta * np.linalg.norm(self.velocity)
+        self.value += _smoothing(cutoff, dt) * (x - self.value)
+        return self.value
+
+    def predict(self, timestamp: float) -> np.ndarray:
+        """Value extrapolated with the filtered velocity"""
+        return self.value + self.velocity * (timestamp - self.timestamp)
+
+
+class PoseFilter:
+    """
+    Smoothing and prediction of a marker pose between detections.
+
+    Translation and rotation (as a quaternion, kept on one hemisphere so
+    that q and -q do not average out) each go through a one-euro filter.
+    predict() extrapolates the filtered pose with its velocity to the time
+    a frame is rendered, so detection can run at a fraction of the render
+    rate. Extrapolation stops MAX_PREDICTION seconds after the last
+    detection, and a marker unseen for RESET_AFTER seconds starts over
+    from its next detection.
+    """
+
+    MIN_CUTOFF = 1.0  # Hz
+    # Cutoff increase per unit of speed (marker units/s, quaternion units/s)
+    BETA_TRANSLATION = 10.0
+    BETA_ROTATION = 20.0
+    # Cutoff of the velocity, which the prediction extrapolates with
+    VELOCITY_CUTOFF = 5.0  # Hz
+    MAX_PREDICTION = 0.1  # seconds
+    RESET_AFTER = 0.5  # seconds
+
+    def __init__(
+        self,
+        min_cutoff: float = MIN_CUTOFF,
+        beta_translation: float = BETA_TRANSLATION,
+        beta_rotation: float = BETA_ROTATION,
+        velocity_cutoff: float = VELOCITY_CUTOFF,
+        max_prediction: float = MAX_PREDICTION,
+    ):
+        self.translation = OneEuroFilter(min_cutoff, beta_translation, velocity_cutoff)
+        self.rotation = OneEuroFilter(min_cutoff, beta_rotation, velocity_cutoff)
+        self.max_prediction = max_prediction
+        # Last detected pose
+        self.measurement = None
+
+    @property
+    def timestamp(self):
+        return self.translation.timestamp
+
+    def reset(self) -> None:
+        self.translation.reset()
+        self.rotation.reset()
+        self.measurement = None
+
+    def update(self, rvec: np.ndarray, tvec: np.ndarray, timestamp: float) -> None:
+        """Feed a detected pose"""
+        if self.timestamp is not None and timestamp - self.timestamp > self.RESET_AFTER:
+            self.reset()
+
+        quaternion = rvec_to_quaternion(rvec)
+        if self.rotation.value is not None and np.dot(quaternion, self.rotation.value) < 0:
+            quaternion = -quaternion
+        # A copy: the detected poses live in buffers reused every frame
+        tvec = np.array(tvec, dtype=np.float64).reshape(3)
+        self.translation.update(tvec, timestamp)
+        self.rotation.update(quaternion, timestamp)
+        self.measurement = (quaternion, tvec)
+
+    def hold(self, timestamp: float) -> None:
+        """Feed the last detected pose again, for a marker known not to have moved"""
+        if self.measurement is None:
+            return
+        quaternion, tvec = self.measurement
+        self.translation.update(tvec, timestamp)
+        self.rotation.update(quaternion, timestamp)
+
+    def predict(self, timestamp: float, rvec: np.ndarray, tvec: np.ndarray) -> None:
+        """Write the pose at `timestamp` into rvec and tvec (3 elements each)"""
+        timestamp = min(timestamp, self.timestamp + self.max_prediction)
+        tvec.reshape(3)[:] = self.translation.predict(timestamp)
+        quaternion = self.rotation.predict(timestamp)
+        quaternion_to_rvec(quaternion / np.linalg.norm(quaternion), rvec)
@@ -3,6 +3,7 @@ from enum import Enum
 from typing import Tuple
 from .molecule import Molecule
 from .levels import LevelMarker
+from .filters import PoseFilter
 
 
 class MarkerState(Enum):
@@ -26,29 +27,49 @@ class Marker:
         marker_extrinsics: Tuple[np.ndarray, np.ndarray],
         projection_matrix,
         level_marker: LevelMarker,
+        timestamp: float = 0.0,
     ):
         self.ctx = ctx
         self.id = id
-        self.marker_pos = marker_extrinsics
+        # Own copy: the estimated poses live in buffers reused every frame
+        self.marker_pos = (marker_extrinsics[0].copy(), marker_extrinsics[1].copy())
+        # Smooths the detected poses and predicts them between detections
+        self.pose_filter = PoseFilter()
+        self.pose_filter.update(*self.marker_pos, timestamp)
         self.state = MarkerState.ACTIVE
         self.frames_lost = 0
+        self.last_seen = timestamp
         self.molecule = None
         self.atoms = None
         self.projection_matrix = projection_matrix
         self.level_marker = level_marker
         self.is_merged = False
 
-        self.INACTIVE_THRESHOLD = 20
+        # Seconds without a detection before the marker is dropped: 20
+        # rendered frames at 60 Hz, whatever the detection rate
+        self.INACTIVE_AFTER = 1 / 3
 
         self.create_atoms(
             name=self.level_marker.get_name(), marker_atoms=level_marker.atoms
         )
         self.is_part_of_solution = level_marker.required
 
-    def update_marker_pos(self, marker_pos: Tuple[np.ndarray, np.ndarray]):
-        self.marker_pos = marker_pos
+    def update_marker_pos(
+        self, marker_pos: Tuple[np.ndarray, np.ndarray], timestamp: float = 0.0
+    ):
+        self.pose_filter.update(*marker_pos, timestamp)
+        self.predict_marker_pos(timestamp)
+
+    def hold_marker_pos(self, timestamp: float):
+        # The scene has not moved since the last detection
+        self.pose_filter.hold(timestamp)
+        self.predict_marker_pos(timestamp)
+
+    def predict_marker_pos(self, timestamp: float):
+        # In place, as the molecules share the pose arrays
+        self.pose_filter.predict(timestamp, *self.marker_pos)
 
-    def update_marker_state(self, state: MarkerState):
+    def update_marker_state(self, state: MarkerState, timestamp: float = 0.0):
         if (
             self.state == MarkerState.ACTIVE
             or MarkerState.NOT_FOUND
@@ -59,8 +80,16 @@ class Marker:
         if self.state == MarkerState.NOT_FOUND and state == MarkerState.ACTIVE:
             self.state = MarkerState.ACTIVE
             self.frames_lost = 0
+            self.last_seen = timestamp
 
-        if self.frames_lost > self.INACTIVE_THRESHOLD:
+        self.check_inactive(timestamp)
+
+    def check_inactive(self, timestamp: float):
+        # Called on every rendered frame, as detection may not run on all of them
+        if (
+            self.state == MarkerState.NOT_FOUND
+            and timestamp - self.last_seen > self.INACTIVE_AFTER
+        ):
             self.state = MarkerState.INACTIVE
 
     def get_marker_pos(self):
@@ -0,0 +1,288 @@
+import time
+import cv2
+import numpy as np
+from typing import List, Tuple
+
+
+class PyramidDetector:
+    """
+    ArUco detection on a downscaled frame, refined at full resolution.
+
+    Frames wider than `max_width` are shrunk to that width (INTER_AREA)
+    before detection, which runs without corner refinement; the corners
+    found are scaled back and refined with cornerSubPix on the full
+    resolution image, so they (and the poses solved from them with the
+    calibration of the full frame, see camera.calibrationFor) keep close
+    to full resolution accuracy at a fraction of the detection cost.
+
+    Has the detectMarkers() of an ArucoDetector, so TrackingDetector can
+    use it as its detector.
+    """
+
+    DETECTION_WIDTH = 960  # pixels
+
+    def __init__(self, detector: cv2.aruco.ArucoDetector, max_width: int = DETECTION_WIDTH):
+        params = detector.getDetectorParameters()
+        # Refined once, at full resolution
+        self.refine_window = params.cornerRefinementWinSize
+        self.refine_criteria = (
+            cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER,
+            params.cornerRefinementMaxIterations,
+            params.cornerRefinementMinAccuracy,
+        )
+        params.cornerRefinementMethod = cv2.aruco.CORNER_REFINE_NONE
+        detector.setDetectorParameters(params)
+        self.detector = detector
+        self.max_width = max_width
+        self._small = None
+
+    def detectMarkers(self, gray: np.ndarray):
+        """(corners, ids, rejected) of a grayscale image, like ArucoDetector.detectMarkers"""
+        height, width = gray.shape[:2]
+        if width > self.max_width:
+            size = (self.max_width, max(1, round(height * self.max_width / width)))
+            if self._small is None or self._small.shape[::-1] != size:
+                self._small = np.empty(size[::-1], dtype=gray.dtype)
+            cv2.resize(gray, size, dst=self._small, interpolation=cv2.INTER_AREA)
+            corners, ids, rejected = self.detector.detectMarkers(self._small)
+            scale = np.array([width / size[0], height / size[1]], dtype=np.float32)
+            rejected = tuple((candidate + 0.5) * scale - 0.5 for candidate in rejected)
+        else:
+            corners, ids, rejected = self.detector.detectMarkers(gray)
+            scale = None
+        if ids is None:
+            return corners, ids, rejected
+
+        points = np.concatenate(corners).reshape(-1, 1, 2)
+        window = self.refine_window
+        if scale is not None:
+            # Pixel centers: (x + 0.5) * scale - 0.5
+            points = (points + 0.5) * scale - 0.5
+            # The scaled corners are off by up to a pixel of the small image
+            window = max(window, int(np.ceil(scale.max())) + 2)
+        cv2.cornerSubPix(gray, points, (window, window), (-1, -1), self.refine_criteria)
+        corners = tuple(points.reshape(-1, 1, 4, 2))
+        return corners, ids, rejected
+
+
+class TrackingDetector:
+    """
+    ArUco detection that only searches around the markers of the previous frame.
+
+    Between full-frame scans, each known marker is searched for in its
+    bounding box padded by a fraction of its size, so the detection cost
+    follows the area of the markers instead of the frame size. A full scan
+    runs every FULL_SCAN_INTERVAL frames (to pick up markers that entered
+    the frame) and whenever a tracked marker is not found in its region.
+    """
+
+    FULL_SCAN_INTERVAL = 10
+    # Padding around a marker's bounding box, relative to its longest side
+    ROI_PADDING = 0.25
+    MIN_ROI_PADDING = 16  # pixels
+
+    def __init__(
+        self,
+        detector: cv2.aruco.ArucoDetector,
+        full_scan_interval: int = FULL_SCAN_INTERVAL,
+        padding: float = ROI_PADDING,
+        min_padding: int = MIN_ROI_PADDING,
+    ):
+        self.detector = detector
+        self.full_scan_interval = max(1, full_scan_interval)
+        self.padding = padding
+        self.min_padding = min_padding
+        self.corners: Tuple[np.ndarray, ...] = ()
+        self.ids = None
+        self.frames_since_full_scan = 0
+
+        # Statistics
+        self.frames = 0
+        self.full_scans = 0
+        self.roi_scans = 0
+        self.markers_lost = 0
+
+    def reset(self) -> None:
+        self.corners, self.ids = (), None
+
+    def detect(self, gray: np.ndarray):
+        """Detect the markers of a grayscale frame. Returns (corners, ids) like detectMarkers"""
+        self.frames += 1
+        result = None
+        if self.ids is not None and self.frames_since_full_scan < self.full_scan_interval:
+            result = self._roi_scan(gray)
+            if result is None:
+                self.markers_lost += 1
+
+        if result is None:
+            corners, ids, _ = self.detector.detectMarkers(gray)
+            self.full_scans += 1
+            self.frames_since_full_scan = 1
+        else:
+            corners, ids = result
+            self.roi_scans += 1
+            self.frames_since_full_scan += 1
+
+        self.corners, self.ids = corners, ids
+        return corners, ids
+
+    def regions(self, shape: Tuple[int, ...]) -> List[Tuple[int, int, int, int]]:
+        """Padded (x0, y0, x1, y1) search regions of the known markers, overlapping ones merged"""
+        height, width = shape[:2]
+        boxes = []
+        for corner in self.corners:
+            points = corner.reshape(-1, 2)
+            x0, y0 = points.min(axis=0)
+            x1, y1 = points.max(axis=0)
+            pad = max(self.min_padding, self.padding * max(x1 - x0, y1 - y0))
+            boxes.append([
+                max(0, int(x0 - pad)),
+                max(0, int(y0 - pad)),
+                min(width, int(np.ceil(x1 + pad))),
+                min(height, int(np.ceil(y1 + pad))),
+            ])
+
+        # Merge overlapping regions, so no marker is searched for twice
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(boxes)):
+                for j in range(i + 1, len(boxes)):
+                    a, b = boxes[i], boxes[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        boxes[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                        del boxes[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        return [tuple(box) for box in boxes]
+
+    def _roi_scan(self, gray: np.ndarray):
+        """Search the regions of the known markers, or None when one of them is lost"""
+        found_corners = []
+        found_ids = []
+        for x0, y0, x1, y1 in self.regions(gray.shape):
+            corners, ids, _ = self.detector.detectMarkers(gray[y0:y1, x0:x1])
+            if ids is None:
+                continue
+            offset = np.array([x0, y0], dtype=np.float32)
+            for corner, marker_id in zip(corners, ids):
+                found_corners.append(corner + offset)
+                found_ids.append(marker_id)
+
+        if not set(self.ids.ravel()) <= {marker_id[0] for marker_id in found_ids}:
+            return None
+        return tuple(found_corners), np.array(found_ids, dtype=np.int32).reshape(-1, 1)
+
+
+class DetectionScheduler:
+    """
+    Decides which frames run marker detection.
+
+    Detection runs at most `rate` times a second (0: every frame). When it
+    is due, a small grayscale thumbnail of the frame is compared with the
+    thumbnail of the last detection: if fewer than MOTION_AREA of its
+    pixels changed by more than MOTION_THRESHOLD gray levels, nothing has
+    moved and the detection is skipped, keeping the last poses. A
+    detection still runs at least every MAX_STATIC seconds.
+    """
+
+    THUMBNAIL_WIDTH = 160  # pixels
+    MOTION_THRESHOLD = 12  # gray levels
+    MOTION_AREA = 0.001  # fraction of the thumbnail
+    MAX_STATIC = 1.0  # seconds
+
+    def __init__(
+        self,
+        rate: float = 0.0,
+        thumbnail_width: int = THUMBNAIL_WIDTH,
+        motion_threshold: int = MOTION_THRESHOLD,
+        motion_area: float = MOTION_AREA,
+        max_static: float = MAX_STATIC,
+    ):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.thumbnail_width = thumbnail_width
+        self.motion_threshold = motion_threshold
+        self.motion_area = motion_area
+        self.max_static = max_static
+        self.reference = None
+        self._thumbnail = None
+        self._difference = None
+        # Detect on the first frame
+        self.time_since_check = self.interval
+        self.time_since_detection = 0.0
+        # Whether the last check found the scene unchanged
+        self.static = False
+
+        # Statistics
+        self.frames = 0
+        self.detections = 0
+        self.skipped_rate = 0
+        self.skipped_static = 0
+        self.detection_seconds = 0.0
+        self.motion_seconds = 0.0
+
+    def reset(self) -> None:
+        self.reference = None
+        self.static = False
+
+    def due(self, frame: np.ndarray, frame_time: float) -> bool:
+        """Whether to detect the markers of this frame (BGR/RGB or grayscale)"""
+        self.frames += 1
+        self.time_since_check += frame_time
+        self.time_since_detection += frame_time
+        if self.interval > 0:
+            if self.time_since_check < self.interval:
+                self.skipped_rate += 1
+                return False
+            self.time_since_check %= self.interval
+        else:
+            self.time_since_check = 0.0
+
+        start = time.perf_counter()
+        moved = self._moved(frame)
+        self.motion_seconds += time.perf_counter() - start
+        self.static = not moved and self.time_since_detection < self.max_static
+        if self.static:
+            self.skipped_static += 1
+            return False
+
+        # The frame becomes the reference of the next checks
+        self.reference = self._thumbnail
+        self.time_since_detection = 0.0
+        self.detections += 1
+        return True
+
+    def record_detection(self, seconds: float) -> None:
+        """Report the time a detection (and its pose estimation) took"""
+        self.detection_seconds += seconds
+
+    def _moved(self, frame: np.ndarray) -> bool:
+        height, width = frame.shape[:2]
+        size = (self.thumbnail_width, max(1, round(height * self.thumbnail_width / width)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+        self._thumbnail = small
+        if self.reference is None or self.reference.shape != small.shape:
+            return True
+
+        self._difference = cv2.absdiff(small, self.reference, dst=self._difference)
+        changed = np.count_nonzero(self._difference > self.motion_threshold)
+        return changed > self.motion_area * small.size
+
+    def stats(self) -> dict:
+        frames = max(1, self.frames)
+        checks = max(1, self.detections + self.skipped_static)
+        mean_detection = self.detection_seconds / max(1, self.detections)
+        return {
+            "frames": self.frames,
+            "detections": self.detections,
+            "skip_rate": (self.skipped_rate + self.skipped_static) / frames,
+            "static_skip_rate": self.skipped_static / frames,
+            "mean_detection_ms": mean_detection * 1000,
+            "motion_check_ms": self.motion_seconds / checks * 1000,
+            # Detections the motion gate avoided, less the cost of the checks
+            "saved_seconds": self.skipped_static * mean_detection - self.motion_seconds,
+        }
@@ -0,0 +1,46 @@
+"""
+Gunicorn configuration of the pre-fork multi-worker mode:
+
+    cd chemistry-augmented-reality && gunicorn -c gunicorn.conf.py api.main:app
+
+The app is imported once in the master (preload_app), so levels.yaml, the
+compiled label tables and the ArUco detectors are built before fork and
+shared copy-on-write by every worker. Each worker runs warm-up frames
+through the pipeline before it starts accepting connections, so its /ready
+answers 200 from the first request.
+"""
+import gc
+import os
+
+import cv2
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+keepalive = 5
+
+
+def when_ready(server):
+    # Runs after the preload, before the first fork. Frozen objects are never
+    # scanned by the collector, so GC passes in the workers do not touch (and
+    # copy) the pages shared with the master
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from api.sessions import session_store
+    from api.warmup import readiness
+
+    session_store.after_fork()
+    # Workers already use every core; more OpenCV threads would only contend
+    cv2.setNumThreads(max(1, (os.cpu_count() or 1) // server.cfg.workers))
+
+    try:
+        readiness.run()
+    except Exception:
+        worker.log.exception("Warm-up failed, serving cold")
+        return
+    worker.log.info("Warmed up in %.0f ms", readiness.seconds * 1000)